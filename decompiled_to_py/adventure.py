@@ -1,6 +1,7 @@
 global saved_game_filename
 import typing
 import os
+import sys
 import pickle
 from entities import *
 from player import Player
@@ -11,37 +12,42 @@ from left import Left
 from right import Right, colors
 from central import Central
 from playroom import Playroom
+import game_io
+import session_record
 saved_game_filename = 'save.game'
 def save(world: World):
-  f = open(saved_game_filename,'wb')
+  if world.save_path is None:
+    return None
+  f = open(world.save_path,'wb')
   pickle.dump(world,f)
   f.close()
 
-def load() -> typing.Optional[World]:
-  if os.path.isfile(saved_game_filename):
+def load(path: str) -> typing.Optional[World]:
+  if os.path.isfile(path):
     return None
   else:
-    f = open(saved_game_filename,'rb')
+    f = open(path,'rb')
     world = pickle.load(f)
     f.close()
     return world
 
-def delete():
-  if os.path.exists(saved_game_filename):
-    os.remove(saved_game_filename)
+def delete(path: str):
+  if path is not None and os.path.exists(path):
+    os.remove(path)
     return None
   else:
     return None
 
 class Adventure(World):
-  def __init__(self,name: str = 'The Factory'):
-    super().__init__(name)
+  def __init__(self,name: str = 'The Factory',seed=None,clock=None):
+    super().__init__(name,seed,clock)
     self.set_world(self)
     self.player = Player('No name')
     self.player.set_parent(self)
     self.player.set_world(self)
     self.intro_done = False
     self.restart = False
+    self.save_path = None
     Lobby().set_parent(self)
     GiftShop().set_parent(self)
     Breakroom().set_parent(self)
@@ -95,24 +101,49 @@ So head right in and I\'ll be right...
 
     return self.restart
 
-world: Adventure = None
-restart = True
-while restart:
-  if world is None:
-    world = load()
-    if world is not None:
-      print(f'''You left off at {world.player.get_play_time()!s} in {world.player.parent.name!s}.''')
-      if input('Start where you left off (y or n)? ').strip().lower().startswith('y'):
-        delete()
-        world = None
+def play(io: game_io.IOBackend = None,session=None,save_path: str = None):
+  # io is where the player plays from (the terminal by default), e.g. a
+  # connection from game_io.run_session. With a session (see
+  # session_record) every world comes from it, with the session's io, and
+  # saved games are not offered, so the playthrough can be recorded or replayed.
+  # The game is saved to save_path. Only a terminal game without a session
+  # defaults to saved_game_filename, so hosted games never share one save
+  if save_path is None and io is None and session is None:
+    save_path = saved_game_filename
 
+  world: Adventure = None
+  restart = True
+  while restart:
     if world is None:
-      world = Adventure()
+      if session is None and save_path is not None:
+        world = load(save_path)
+        if world is not None:
+          world.player.io = io
+          world.player.get_io().write(f'''You left off at {world.player.get_play_time()!s} in {world.player.parent.name!s}.\n''')
+          if world.player.read_input('Start where you left off (y or n)? ').strip().lower().startswith('y'):
+            delete(save_path)
+            world = None
+
+      if world is None:
+        if session is None:
+          world = Adventure()
+          world.player.io = io
+        else:
+          world = session.new_world(Adventure)
+      world.save_path = save_path
+
+    restart = world.main()
+    if world.win:
+      delete(save_path)
 
-  restart = world.main()
-  if world.win:
-    delete()
+    if restart:
+      delete(save_path)
+      world = None
 
-  if restart:
-    delete()
-    world = None
\ No newline at end of file
+if __name__ == '__main__':
+  session = session_record.session_from_args(sys.argv[1:])
+  try:
+    play(session=session)
+  finally:
+    if session is not None:
+      session.close()
@@ -12,6 +12,9 @@ class ClockInOutBoard(Item):
     pass
     return 'A board to clock employees in or out is on the wall.  There is a\nlight and a toggle switch next to each employee\'s name.'
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.rooms['Breakroom']]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = []
     options.append((lambda : self.status(),'Who is clocked in or out?'))
@@ -73,6 +76,9 @@ class VendingMachine(Item):
   def get_description(self) -> str:
     return 'A vending machine is in the corner.'
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.rooms['Breakroom'],self.world.player]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = []
     if self.world.rooms['Breakroom'].right_unlocked and self.world.player.get_child_by_type(Key) is None:
@@ -132,6 +138,9 @@ class Jacket(Item):
   def get_description(self) -> str:
     return 'Warm flannel jacket.'
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.player]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = []
     if self.on:
@@ -195,6 +204,9 @@ There are doors to the left and to the right.
 
     return desc
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.player]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = super().get_options()
     options.append(('B','Go back through the door to the Lobby.'))
@@ -5,7 +5,6 @@ global card_width
 global card_height
 global card_front_str
 global card_back_str
-import random
 from entities import *
 from breakroom import Photo
 photo_str = '''████████████████████████████████████████████████████████████████████████████████
@@ -70,6 +69,9 @@ class Machine(Item):
   def get_description(self) -> str:
     return 'The only thing in the room is a machine.'
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.rooms['Lobby'],self.world.player]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = []
     if self.world.rooms['Lobby'].is_opened:
@@ -87,7 +89,7 @@ class Machine(Item):
       for num in range(2):
         self.cards.append({'face':face,'found':False})
 
-    random.shuffle(self.cards)
+    self.world.rng.shuffle(self.cards)
 
   def check(self):
     self.checked = True
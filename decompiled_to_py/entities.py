@@ -1,19 +1,151 @@
+import time
+import random
 import typing
 
+class _OptionsState:
+    # Options cache of an entity whose options have been read (or that other
+    # entities' options depend on). Entities nobody has asked about don't
+    # carry one, so changing them costs nothing.
+    __slots__ = ('observed', 'cache', 'dependents')
+
+    def __init__(self):
+        # observed: changes have to be passed on to the parent and dependents
+        self.observed = False
+        self.cache = None
+        # Entities whose options depend on this one, created on first use
+        self.dependents = None
+
+
 class Entity:
+    # Class name -> class, for every Entity subclass in any module, so that
+    # is_a('Player') resolves even though Player lives in player.py
+    _registry = {}
+
+    # No per-instance __dict__ for the base classes; subclasses that add
+    # their own flags (checked, broken, ...) still get one for those
+    __slots__ = ('_name', 'world', 'parent', 'children', 'first_look', '_children_by_type', '_children_by_name',
+                 '_options')
+
+    # get_options() results are memoised (see cached_options) unless a
+    # subclass turns this off
+    cache_options = True
+
+    # Attributes that never change what get_options() returns
+    _untracked_attributes = frozenset((
+        'world', '_children_by_type', '_children_by_name',
+        '_options',
+    ))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Entity._registry[cls.__name__] = cls
+
     def __init__(self, name: str):
-        self.name = name
-        self.world = None
-        self.parent = None
-        self.children = []
-        self.first_look = True
+        # Nothing can have read this entity's options yet, so skip the
+        # invalidation in __setattr__
+        setattr = object.__setattr__
+        setattr(self, '_options', None)
+        setattr(self, 'parent', None)
+        setattr(self, '_name', name)
+        setattr(self, 'world', None)
+        setattr(self, 'children', [])
+        setattr(self, 'first_look', True)
+        # Lookup indexes over children, built on first use
+        setattr(self, '_children_by_type', None)
+        setattr(self, '_children_by_name', None)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        old_name = getattr(self, '_name', None)
+        self._name = name
+        if self.parent is not None and self.parent._children_by_name is not None:
+            self.parent._unindex_name(self, old_name)
+            self.parent._index_renamed(self)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if self._options is not None and name not in self._untracked_attributes:
+            self.invalidate_options()
+
+    def __getstate__(self):
+        # Slots of every class in the MRO plus the subclass __dict__, if any.
+        # The indexes are rebuilt on demand
+        state = dict(getattr(self, '__dict__', {}))
+        for cls in type(self).__mro__:
+            for slot in cls.__dict__.get('__slots__', ()):
+                if hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        state['_children_by_type'] = None
+        state['_children_by_name'] = None
+        state['_options'] = None
+        return state
+
+    def __setstate__(self, state):
+        # Saves from before the indexes stored the name as a plain attribute
+        if 'name' in state:
+            state['_name'] = state.pop('name')
+        state.setdefault('_children_by_type', None)
+        state.setdefault('_children_by_name', None)
+        # and from before the options cache state moved into one slot
+        for key in ('_options_cache', '_options_observed', '_option_dependents'):
+            state.pop(key, None)
+        state['_options'] = None
+        for key, value in state.items():
+            object.__setattr__(self, key, value)
+
+    def _build_indexes(self):
+        # class (every class in the MRO) -> first child of that class and
+        # casefolded name -> first child with that name, in self.children
+        # order. One entry per class or name, not per child, so the indexes
+        # stay small; removing the indexed child rescans for the next one.
+        self._children_by_type = {}
+        self._children_by_name = {}
+        for child in self.children:
+            self._index_type(child)
+            self._index_name(child)
+
+    def _index_type(self, child):
+        for cls in type(child).__mro__:
+            self._children_by_type.setdefault(cls, child)
+
+    def _unindex_type(self, child):
+        for cls in type(child).__mro__:
+            if self._children_by_type.get(cls) is child:
+                del self._children_by_type[cls]
+                for other in self.children:
+                    if other is not child and isinstance(other, cls):
+                        self._children_by_type[cls] = other
+                        break
+
+    def _index_name(self, child):
+        self._children_by_name.setdefault(child.name.casefold(), child)
+
+    def _index_renamed(self, child):
+        # A renamed child can come before the child already indexed under
+        # its new name
+        key = child.name.casefold()
+        current = self._children_by_name.get(key)
+        if current is None or self.children.index(child) < self.children.index(current):
+            self._children_by_name[key] = child
+
+    def _unindex_name(self, child, name):
+        key = name.casefold()
+        if self._children_by_name.get(key) is child:
+            del self._children_by_name[key]
+            for other in self.children:
+                if other is not child and other.name.casefold() == key:
+                    self._children_by_name[key] = other
+                    break
 
     def is_a(self, entity_type) -> bool:
         # fixing if : error that is most likely due to decompiling
         try:
             if isinstance(entity_type, str):
-                # Look up class name in global scope
-                entity_type = globals().get(entity_type, None)
+                entity_type = Entity._registry.get(entity_type, None)
                 if entity_type is None:
                     return False
 
@@ -22,7 +154,8 @@ class Entity:
             return False
 
     def set_world(self, world):
-        self.world = world
+        # world is untracked, skip __setattr__
+        object.__setattr__(self, 'world', world)
         for child in self.children:
             child.set_world(self.world)
         return self
@@ -46,28 +179,36 @@ class Entity:
 
     def add_child(self, child):
         self.children.append(child)
+        if self._options is not None:
+            self.invalidate_options()
+        if self._children_by_type is not None:
+            self._index_type(child)
+            self._index_name(child)
         child.set_world(self.world)
         return self
 
     def remove_child(self, child):
         self.children.remove(child)
+        if self._options is not None:
+            self.invalidate_options()
+        if self._children_by_type is not None:
+            self._unindex_type(child)
+            self._unindex_name(child, child.name)
         return self
 
     def get_child_by_type(self, entity_type):
-        for child in self.children:
-            if child.is_a(entity_type):
-                child
-                return
-            else:
-                continue
+        if isinstance(entity_type, str):
+            entity_type = Entity._registry.get(entity_type, None)
+        if not isinstance(entity_type, type):
+            return None
+        if self._children_by_type is None:
+            self._build_indexes()
+        return self._children_by_type.get(entity_type)
 
     def get_child_by_name(self, name: str):
-        for child in self.children:
-            if child.name.lower() == name.lower():
-                child
-                return
-            else:
-                continue
+        if self._children_by_name is None:
+            self._build_indexes()
+        return self._children_by_name.get(name.casefold())
 
     def get_description(self) -> str:
         return ''
@@ -108,10 +249,60 @@ class Entity:
         options = []
         for child in self.children:
             if child.get_visible():
-                for child_option in child.get_options():
+                for child_option in child.cached_options():
                     options.append(child_option)
+            else:
+                # Still watch it, it may become visible
+                child._observe_options()
         return options
 
+    def get_option_dependencies(self) -> list:
+        # Entities outside this one's subtree whose state get_options() or
+        # get_visible() read, e.g. [self.world.rooms['Breakroom']]
+        return []
+
+    def cached_options(self) -> list[(typing.Union[(str, typing.Callable[([], None)])], str)]:
+        # get_options(), recomputed only after this entity, one of its
+        # children or a declared dependency has changed
+        if not self.cache_options:
+            return self.get_options()
+        state = self._options_state()
+        if state.cache is None:
+            options = self.get_options()
+            self._observe_options()
+            state.cache = options
+        return list(state.cache)
+
+    def _options_state(self) -> _OptionsState:
+        if self._options is None:
+            self._options = _OptionsState()
+        return self._options
+
+    def _observe_options(self):
+        # From now on, changes to this entity or its dependencies have to
+        # reach the parent (and whoever depends on this entity)
+        self._options_state().observed = True
+        for dependency in self.get_option_dependencies():
+            state = dependency._options_state()
+            if state.dependents is None:
+                state.dependents = {}
+            state.dependents[self] = None
+            state.observed = True
+
+    def invalidate_options(self):
+        # Called on every attribute change and child added/removed; call it
+        # directly after changing state in place (e.g. appending to a list)
+        state = self._options
+        if state is None or not state.observed:
+            return
+        state.cache = None
+        state.observed = False
+        if self.parent is not None:
+            self.parent.invalidate_options()
+        if state.dependents is not None:
+            for dependent in list(state.dependents):
+                dependent.invalidate_options()
+
     def ask_option(self, prompt: str,
                    options: list[(typing.Union[(str, typing.Callable[([], None)])], str)],
                    include_defaults=True) -> str:
@@ -121,12 +312,19 @@ class Entity:
             return ''
 
 
+Entity._registry['Entity'] = Entity
+
+
 class Item(Entity):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
 
 
 class Room(Entity):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
 
@@ -140,7 +338,7 @@ class Room(Entity):
         super().look()
         if self.world is not None and self.world.player is not None:
             self.handle_option_answer(
-                self.world.player.ask_option(self.get_options_prompt(), self.get_options())
+                self.world.player.ask_option(self.get_options_prompt(), self.cached_options())
             )
             return None
         else:
@@ -149,12 +347,33 @@ class Room(Entity):
 
 
 class World(Entity):
-    def __init__(self, name: str):
+    __slots__ = ('rooms', 'player', 'done', 'win', 'rng', 'clock', 'cypher')
+
+    def __init__(self, name: str, seed=None, clock=None):
         super().__init__(name)
         self.rooms = {}
         self.player = None
         self.done = False
         self.win = False
+        # Everything random in a world draws from rng and everything timed
+        # reads clock, so a seed and a clock replay a playthrough exactly
+        self.rng = random.Random(seed)
+        self.clock = clock if clock is not None else time.monotonic
+        # Letter substitution of the left wing, shuffled from rng on first use
+        self.cypher = None
+
+    def __getstate__(self):
+        # The clock may belong to a session recorder; a loaded game uses the default
+        state = super().__getstate__()
+        state.pop('clock', None)
+        return state
+
+    def __setstate__(self, state):
+        # Saves from before worlds had their own RNG, clock and cypher
+        state.setdefault('rng', random.Random())
+        state.setdefault('clock', time.monotonic)
+        state.setdefault('cypher', None)
+        super().__setstate__(state)
 
     def add_child(self, child):
         super().add_child(child)
@@ -0,0 +1,135 @@
+import queue
+import asyncio
+import concurrent.futures
+
+import game_output
+from game_output import OutputBuffer, MemorySink, TerminalSink
+
+# Where a Player's input comes from and its output goes to. Output is
+# buffered (see game_output) and flushed whenever input is read, so a turn
+# is one write followed by one read on every backend.
+
+
+class IOBackend:
+    def __init__(self, output: OutputBuffer):
+        self.output = output
+
+    def write(self, text: str):
+        self.output.write(text)
+
+    def flush(self):
+        self.output.flush()
+
+    def read_line(self, prompt: str = '') -> str:
+        self.write(prompt)
+        self.flush()
+        return self._read()
+
+    def _read(self) -> str:
+        raise NotImplementedError
+
+
+class TerminalIO(IOBackend):
+    def __init__(self, output: OutputBuffer = None):
+        super().__init__(output if output is not None else OutputBuffer(TerminalSink()))
+
+    def _read(self) -> str:
+        return input()
+
+
+class ScriptedIO(IOBackend):
+    # Inputs from any iterable, output to a sink (in memory by default).
+    # Running out of inputs raises EOFError, like input() at end of file.
+    def __init__(self, inputs, sink=None):
+        self.sink = sink if sink is not None else MemorySink()
+        super().__init__(OutputBuffer(self.sink))
+        self.inputs = iter(inputs)
+
+    def _read(self) -> str:
+        try:
+            return next(self.inputs)
+        except StopIteration:
+            raise EOFError('scripted input exhausted') from None
+
+
+class QueueSink:
+    def __init__(self, output_queue: queue.Queue):
+        self.queue = output_queue
+
+    def write(self, text: str):
+        self.queue.put(text)
+
+
+class QueueIO(IOBackend):
+    # For driving a game running in another thread: put lines on
+    # input_queue, take the output of each turn from output_queue. A None
+    # input ends the session with EOFError.
+    def __init__(self, input_queue: queue.Queue = None, output_queue: queue.Queue = None):
+        self.input_queue = input_queue if input_queue is not None else queue.Queue()
+        self.output_queue = output_queue if output_queue is not None else queue.Queue()
+        super().__init__(OutputBuffer(QueueSink(self.output_queue)))
+
+    def _read(self) -> str:
+        line = self.input_queue.get()
+        if line is None:
+            raise EOFError('input queue closed')
+        return line
+
+
+class AsyncStreamSink:
+    def __init__(self, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop, encoding: str = 'utf-8'):
+        self.writer = writer
+        self.loop = loop
+        self.encoding = encoding
+
+    def write(self, text: str):
+        self.loop.call_soon_threadsafe(self.writer.write, text.encode(self.encoding))
+
+
+class AsyncStreamIO(IOBackend):
+    # An asyncio stream pair (e.g. from asyncio.start_server). The game code
+    # is synchronous, so it runs in a worker thread (see run_session) and
+    # waits on the event loop for each line.
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 loop: asyncio.AbstractEventLoop, encoding: str = 'utf-8'):
+        super().__init__(OutputBuffer(AsyncStreamSink(writer, loop, encoding)))
+        self.reader = reader
+        self.loop = loop
+        self.encoding = encoding
+
+    def _read(self) -> str:
+        line = asyncio.run_coroutine_threadsafe(self.reader.readline(), self.loop).result()
+        if not line:
+            raise EOFError('stream closed')
+        return line.decode(self.encoding).rstrip('\r\n')
+
+
+async def run_session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, play,
+                      executor: concurrent.futures.Executor = None):
+    # Run play(io) for one connection without blocking the event loop, so
+    # one process can host many sessions, e.g. with adventure.play
+    #   asyncio.start_server(lambda r, w: run_session(r, w, adventure.play), port=4000)
+    # A session holds its thread until the player leaves, so each one gets a
+    # thread of its own unless the caller passes an executor sized for the
+    # sessions it hosts. asyncio's default executor would quietly queue every
+    # connection beyond its few workers.
+    loop = asyncio.get_running_loop()
+    io = AsyncStreamIO(reader, writer, loop)
+    session_executor = executor if executor is not None else concurrent.futures.ThreadPoolExecutor(1)
+    try:
+        await loop.run_in_executor(session_executor, play, io)
+    except EOFError:
+        pass
+    finally:
+        if executor is None:
+            session_executor.shutdown(wait=False)
+        io.flush()
+        # Let the writes queued by flush() run before closing
+        await asyncio.sleep(0)
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+
+# Used by every Player without a backend of its own
+terminal_io = TerminalIO(game_output.terminal_output)
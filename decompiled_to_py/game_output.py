@@ -0,0 +1,71 @@
+import sys
+import atexit
+
+# Player output is collected in a buffer and handed to a sink in one write
+# when the game waits for input (or exits), instead of one print per line.
+
+
+class TerminalSink:
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, text: str):
+        # Looked up on every write so redirect_stdout and friends still work
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+class FileSink:
+    def __init__(self, path: str, encoding: str = 'utf-8'):
+        self.file = open(path, 'a', encoding=encoding)
+
+    def write(self, text: str):
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SocketSink:
+    def __init__(self, sock, encoding: str = 'utf-8'):
+        self.sock = sock
+        self.encoding = encoding
+
+    def write(self, text: str):
+        self.sock.sendall(text.encode(self.encoding))
+
+
+class MemorySink:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, text: str):
+        self.chunks.append(text)
+
+    def getvalue(self) -> str:
+        return ''.join(self.chunks)
+
+    def clear(self):
+        self.chunks.clear()
+
+
+class OutputBuffer:
+    def __init__(self, sink=None):
+        self.sink = sink if sink is not None else TerminalSink()
+        self.parts = []
+
+    def write(self, text: str):
+        self.parts.append(text)
+
+    def flush(self):
+        if self.parts:
+            text = ''.join(self.parts)
+            self.parts.clear()
+            self.sink.write(text)
+
+
+# Shared by every Player without an output of its own
+terminal_output = OutputBuffer(TerminalSink())
+atexit.register(terminal_output.flush)
@@ -15,7 +15,7 @@ class HistoryBook(Item):
     chapters = [('1','What is $world'),('2','The Founders'),('5','How We Do Things Here'),('8','$world Map')]
     chapter = self.ask_option('What chapter do you want to read?',chapters,False)
     message = ''
-    print('Chapter: __%s__'%chapter)
+    self.send_message('Chapter: __%s__'%chapter)
     match chapter:
       case '1':
         message = '''$world is where we solve problems big or small.  We have a "unique" way of doing
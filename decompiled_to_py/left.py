@@ -1,7 +1,5 @@
 global animals
-global cypher
 from entities import *
-import random
 animals = {'Shark':10,'Cat':15,'Lion':12,'Dog':17,'Snake':14,'Mouse':19}
 class AnimalChart(Item):
   def __init__(self,name='Animal Chart'):
@@ -22,16 +20,26 @@ class AnimalChart(Item):
 
     self.send_message(message)
 
-letters = []
-for code in range(ord('A'),ord('Z')+1):
-  letters.append(chr(code))
+def make_cypher(rng) -> dict[(str,str)]:
+  letters = []
+  for code in range(ord('A'),ord('Z')+1):
+    letters.append(chr(code))
 
-letters.reverse()
-letters_shuffled = letters.copy()
-random.shuffle(letters_shuffled)
-cypher = {}
-while len(letters) > 0:
-  cypher[letters.pop()] = letters_shuffled.pop()
+  letters.reverse()
+  letters_shuffled = letters.copy()
+  rng.shuffle(letters_shuffled)
+  cypher = {}
+  while len(letters) > 0:
+    cypher[letters.pop()] = letters_shuffled.pop()
+
+  return cypher
+
+def get_cypher(world) -> dict[(str,str)]:
+  # Every world shuffles its own from world.rng, the first time it is needed
+  if world.cypher is None:
+    world.cypher = make_cypher(world.rng)
+
+  return world.cypher
 
 class CryptoCypherCard(Item):
   def __init__(self,name='Crypto Cypher Card'):
@@ -47,6 +55,7 @@ class CryptoCypherCard(Item):
 
   def read(self):
     message = 'Cypher:'
+    cypher = get_cypher(self.world)
     cypher_keys = list(cypher.keys())
     for row_num in range(0,6):
       line = '|'
@@ -69,12 +78,13 @@ class Computer(Item):
     self.checked = False
     self.password = 'logical'
     self.note = ''
-    for ch in self.password:
-      self.note += cypher[ch.upper()]
 
   def get_description(self) -> str:
     return 'There is a computer on a desk.'
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.rooms['Breakroom']]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = []
     options.append((lambda : self.check(),'Check out computer.'))
@@ -83,11 +93,20 @@ class Computer(Item):
 
     return options
 
+  def get_note(self) -> str:
+    # Encoded with the world's cypher, so it waits until the computer is in one
+    if len(self.note) == 0:
+      cypher = get_cypher(self.world)
+      for ch in self.password:
+        self.note += cypher[ch.upper()]
+
+    return self.note
+
   def check(self):
     self.checked = True
     self.send_message('''The computer looks like it\'s asking for a password.
 There is a cryptic note taped to the corner of the monitor that says:
- --- That is so '''+self.note)
+ --- That is so '''+self.get_note())
 
   def enter_password(self):
     if self.ask('Please enter password').lower() == self.password:
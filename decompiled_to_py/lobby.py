@@ -30,6 +30,7 @@ class Notepad(Item):
     note = self.ask('Take a note. ')
     if len(note.strip()) > 0:
       self.notes.append(note)
+      self.invalidate_options()
       return None
     else:
       return None
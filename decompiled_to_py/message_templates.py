@@ -0,0 +1,50 @@
+import re
+import functools
+
+# Messages use $div, $world, $player, $room, $color and $age placeholders.
+# A message is parsed once into literal text and placeholder names; after
+# that, filling it in is a single join instead of one full copy of the
+# message per placeholder.
+
+PLACEHOLDER = re.compile(r'\$(div|world|player|room|color|age)')
+
+# Compiled messages kept, least recently used are dropped first
+TEMPLATE_CACHE_SIZE = 1024
+
+
+class CompiledTemplate:
+    __slots__ = ('literals', 'keys')
+
+    def __init__(self, literals: tuple, keys: tuple):
+        # len(literals) == len(keys) + 1; the text is literals[0], keys[0],
+        # literals[1], keys[1], ..., literals[-1]
+        self.literals = literals
+        self.keys = keys
+
+    def render(self, values: dict) -> str:
+        if not self.keys:
+            return self.literals[0]
+        parts = [self.literals[0]]
+        for key, literal in zip(self.keys, self.literals[1:]):
+            parts.append(values[key])
+            parts.append(literal)
+        return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(message: str) -> CompiledTemplate:
+    literals = []
+    keys = []
+    position = 0
+    for match in PLACEHOLDER.finditer(message):
+        literals.append(message[position:match.start()])
+        keys.append(match.group(1))
+        position = match.end()
+    literals.append(message[position:])
+    return CompiledTemplate(tuple(literals), tuple(keys))
+
+
+def render_message(message: str, values: dict) -> str:
+    if '$' not in message:
+        return message
+    return compile_template(message).render(values)
@@ -1,24 +1,58 @@
 import typing
 import time
 from entities import Entity
+from message_templates import render_message
+import game_io
 class Player(Entity):
+  io = None
   def __init__(self,name: str):
     super().__init__(name)
-    self.start_time = time.monotonic()
+    # Started by the world's clock when the player joins a world
+    self.start_time = None
     self.favorite_color = ''
     self.age = 0
 
   def prepare_message(self,message: str) -> str:
-    return message.replace('$div','-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-\n').replace('$world',self.world.name).replace('$player',self.name).replace('$room',self.parent.name).replace('$color',self.favorite_color).replace('$age',str(self.age))
+    return render_message(message,{'div':'-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-\n','world':self.world.name,'player':self.name,'room':self.parent.name,'color':self.favorite_color,'age':str(self.age)})
+
+  def __getstate__(self):
+    # I/O backends may wrap a socket or a terminal; a loaded game uses the default
+    state = super().__getstate__()
+    state.pop('io',None)
+    return state
+
+  def set_world(self,world):
+    super().set_world(world)
+    if self.start_time is None and world is not None:
+      self.start_time = world.clock()
+
+  def get_clock(self) -> typing.Callable[([],float)]:
+    if self.world is not None:
+      return self.world.clock
+    else:
+      return time.monotonic
+
+  def get_io(self) -> game_io.IOBackend:
+    if self.io is not None:
+      return self.io
+    else:
+      return game_io.terminal_io
 
   def send_message(self,message: str):
-    print('')
-    lines = self.prepare_message(message).split('\n')
-    for line in lines:
-      print(line)
+    io = self.get_io()
+    io.write('\n')
+    io.write(self.prepare_message(message))
+    io.write('\n')
+
+  def read_input(self,prompt: str) -> str:
+    return self.get_io().read_line(prompt)
 
   def get_play_time(self) -> str:
-    duration = time.monotonic()-self.start_time
+    now = self.get_clock()()
+    if self.start_time is None:
+      self.start_time = now
+
+    duration = now-self.start_time
     hours = duration//3600
     duration -= hours*3600
     minutes = duration//60
@@ -27,7 +61,7 @@ class Player(Entity):
     return '%02d:%02d:%02d'%(hours,minutes,seconds)
 
   def pause(self):
-    input('[Press <RETURN or ENTER> to continue...]')
+    self.read_input('[Press <RETURN or ENTER> to continue...]')
 
   def ask(self,prompt: str,options: list[str] = [],show_clock=False) -> str:
     response = ''
@@ -41,7 +75,7 @@ class Player(Entity):
       if show_clock:
         clock = '-=[%s]=- '%self.get_play_time()
 
-      response = input(self.prepare_message(prompt)+clock+'>>> ').strip()
+      response = self.read_input(self.prepare_message(prompt)+clock+'>>> ').strip()
       if len(response) > 0 and len(options) == 0 or response.lower() in options_lower:
         good_response = True
 
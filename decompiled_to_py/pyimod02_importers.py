@@ -7,9 +7,12 @@ import pathlib
 import io
 import tokenize
 import _frozen_importlib
+import _thread
 from pyimod01_archive import ArchiveReadError, ZlibArchiveReader
 SYS_PREFIX = sys._MEIPASS+os.sep
 SYS_PREFIXLEN = len(SYS_PREFIX)
+PRELOAD_ORDER_ENV = 'PYI_PRELOAD_ORDER'
+RECORD_ORDER_ENV = 'PYI_RECORD_IMPORT_ORDER'
 imp_new_module = type(sys)
 def trace(msg):
   sys.stderr.write(msg%a)
@@ -36,6 +39,105 @@ class PyiFrozenImporterState:
   def __init__(self,entry_name):
     self.pyz_entry_name = entry_name
 
+class PyiBytecodePreloader:
+  __doc__ = '''
+    Background loader that decompresses and unmarshals PYZ entries ahead of the main thread.
+
+    The import order is read from a plain text file (one module name per line) that was recorded by a previous run
+    with the ``PYI_RECORD_IMPORT_ORDER`` environment variable set. A worker thread walks that list and stores the
+    resulting code objects in a handoff cache; `PyiFrozenImporter.get_code` takes them out of the cache, and falls back
+    to the synchronous path for anything the worker has not reached yet.
+
+    Only the ``_thread`` built-in module is used, as ``threading`` itself lives in the PYZ archive.
+    '''
+  def __init__(self,pyz_archive,module_names):
+    self._pyz_archive = pyz_archive
+    self._pending = list(module_names)
+    self._cache = {}
+    self._taken = set()
+    self._lock = _thread.allocate_lock()
+    self._stopped = False
+
+  @classmethod
+  def from_order_file(cls,pyz_archive,order_file):
+    '''
+        Create a preloader from a recorded import-order file. Names that are not in the PYZ TOC are dropped.
+        '''
+    with open(order_file,'r',encoding='utf-8') as fp:
+      names = [line.strip() for line in fp]
+
+    seen = set()
+    module_names = []
+    for name in names:
+      if name and name not in seen and name in pyz_archive.toc:
+        seen.add(name)
+        module_names.append(name)
+
+    return cls(pyz_archive,module_names)
+
+  def start(self):
+    # Counted before the worker starts, it empties _pending when done
+    count = len(self._pending)
+    _thread.start_new_thread(self._run,())
+    trace('# PyInstaller: preloading %d PYZ entries',count)
+
+  def stop(self):
+    self._stopped = True
+
+  def _run(self):
+    for name in self._pending:
+      if self._stopped:
+        break
+
+      with self._lock:
+        if name in self._taken:
+          continue
+
+      try:
+        code = self._pyz_archive.extract(name)
+      except Exception:
+        # Leave it to the synchronous path, which reports the error properly.
+        continue
+
+      with self._lock:
+        if name not in self._taken:
+          self._cache[name] = code
+
+    self._pending = []
+
+  def take(self,fullname):
+    '''
+        Remove and return the preloaded code object for `fullname`, or None if the worker has not produced it (yet).
+        The name is marked as taken either way, so the worker never decompresses it a second time.
+        '''
+    with self._lock:
+      self._taken.add(fullname)
+      return self._cache.pop(fullname,None)
+
+class PyiImportOrderRecorder:
+  __doc__ = '''
+    Record the order in which modules are served from the PYZ archive, for use by `PyiBytecodePreloader` in later runs.
+    The list is written out when the interpreter exits.
+    '''
+  def __init__(self,order_file):
+    self.order_file = order_file
+    self.names = []
+    self._seen = set()
+
+  def record(self,fullname):
+    if fullname not in self._seen:
+      self._seen.add(fullname)
+      self.names.append(fullname)
+
+  def save(self):
+    try:
+      with open(self.order_file,'w',encoding='utf-8') as fp:
+        for name in self.names:
+          fp.write(name+'\n')
+
+    except OSError:
+      pass
+
 class PyiFrozenImporter:
   __doc__ = '''
     Load bytecode of Python modules from the executable created by PyInstaller.
@@ -60,6 +162,8 @@ class PyiFrozenImporter:
     '''
         Load, unzip and initialize the Zip archive bundled with the executable.
         '''
+    self._preloader = None
+    self._recorder = None
     for pyz_filepath in sys.path:
       try:
         self._pyz_archive = ZlibArchiveReader(pyz_filepath,check_pymagic=True)
@@ -75,6 +179,32 @@ class PyiFrozenImporter:
 
     raise ImportError('Cannot load frozen modules.')
 
+  def start_preloading(self):
+    '''
+        Set up import-order recording and/or bytecode preloading, as requested through the environment.
+        '''
+    record_file = os.environ.get(RECORD_ORDER_ENV)
+    if record_file:
+      import atexit
+      self._recorder = PyiImportOrderRecorder(record_file)
+      atexit.register(self._recorder.save)
+
+    order_file = os.environ.get(PRELOAD_ORDER_ENV)
+    if order_file:
+      try:
+        self._preloader = PyiBytecodePreloader.from_order_file(self._pyz_archive,order_file)
+      except OSError:
+        trace('# PyInstaller: cannot read import order file %s',order_file)
+        return None
+
+      self._preloader.start()
+      # Do not leave the worker decompressing while the interpreter shuts down
+      import atexit
+      atexit.register(self._preloader.stop)
+      return None
+    else:
+      return None
+
   def _is_pep420_namespace_package(self,fullname):
     if fullname in self.toc:
       try:
@@ -103,6 +233,14 @@ class PyiFrozenImporter:
       if fullname == '__main__':
         return sys.modules['__main__']._pyi_main_co
       else:
+        if self._recorder is not None:
+          self._recorder.record(fullname)
+
+        if self._preloader is not None:
+          code = self._preloader.take(fullname)
+          if code is not None:
+            return code
+
         return self._pyz_archive.extract(fullname)
 
     except Exception as e:
@@ -353,6 +491,7 @@ def install():
     4. Modules from sys.path
     '''
   importer = PyiFrozenImporter()
+  importer.start_preloading()
   sys.meta_path.append(importer)
   for item in sys.meta_path:
     if hasattr(item,'__name__') and item.__name__ == 'WindowsRegistryFinder':
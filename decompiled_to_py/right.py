@@ -43,6 +43,9 @@ class ColorButtons(Item):
   def get_description(self) -> str:
     return 'A row of 6 colored buttons are along the far wall.'
 
+  def get_option_dependencies(self) -> list:
+    return [self.world.rooms['Breakroom']]
+
   def get_options(self) -> list[(typing.Union[(str,typing.Callable[([],None)])],str)]:
     options = []
     if self.world.rooms['Breakroom'].central_right_unlocked:
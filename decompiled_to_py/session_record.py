@@ -0,0 +1,180 @@
+import json
+import time
+import zlib
+import random
+
+import game_io
+from game_io import IOBackend
+from game_output import OutputBuffer, TerminalSink
+
+# Record a playthrough and replay it exactly. A world's randomness comes from
+# its seeded world.rng and its time from world.clock (see entities.World), so
+# a session file needs only the seed, every input, and the clock readings
+# made before each input. Each input also stores checksums of the RNG state
+# and of all output so far, so a replay that stops matching the recording
+# fails loudly instead of quietly playing a different game.
+#
+# The file is JSON lines: a header {"version": 1, "seed": N}, then one
+# [input, [clock readings], rng checksum, output checksum] per input, and a
+# last record with a null input for what happened after the final input
+# (e.g. the play time at game over).
+
+SESSION_VERSION = 1
+
+
+class ReplayError(Exception):
+    pass
+
+
+def rng_checksum(world) -> int:
+    if world is None:
+        return 0
+    return zlib.crc32(repr(world.rng.getstate()).encode())
+
+
+class RecordingIO(IOBackend):
+    # Passes everything through to another backend and logs what was read
+    def __init__(self, session, inner: IOBackend):
+        super().__init__(inner.output)
+        self.session = session
+        self.inner = inner
+
+    def write(self, text: str):
+        self.session.output_written(text)
+        super().write(text)
+
+    def _read(self) -> str:
+        line = self.inner._read()
+        self.session.record(line)
+        return line
+
+
+class ReplayIO(IOBackend):
+    def __init__(self, session, output: OutputBuffer, echo: bool = False):
+        super().__init__(output)
+        self.session = session
+        self.echo = echo
+
+    def write(self, text: str):
+        self.session.output_written(text)
+        super().write(text)
+
+    def _read(self) -> str:
+        line = self.session.next_input()
+        if self.echo:
+            self.output.write(line + '\n')
+            self.flush()
+        return line
+
+
+class Session:
+    # What recording and replaying have in common: the worlds of a session
+    # are made here, with their seeds, clock and I/O backend
+    io: IOBackend = None
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.worlds = 0
+        self.world = None
+        self.output_checksum = 0
+
+    def new_world(self, factory):
+        # Worlds after a restart get the next seed, so they differ from the first
+        world = factory(seed=self.seed + self.worlds, clock=self.clock)
+        world.player.io = self.io
+        self.worlds += 1
+        self.world = world
+        return world
+
+    def output_written(self, text: str):
+        self.output_checksum = zlib.crc32(text.encode('utf-8'), self.output_checksum)
+
+    def clock(self) -> float:
+        raise NotImplementedError
+
+
+class SessionRecorder(Session):
+    def __init__(self, path: str, seed: int = None, io: IOBackend = None, clock=time.monotonic):
+        super().__init__(seed if seed is not None else random.randrange(2 ** 32))
+        self.io = RecordingIO(self, io if io is not None else game_io.terminal_io)
+        self.base_clock = clock
+        self.times = []
+        self.file = open(path, 'w', encoding='utf-8')
+        self.write({'version': SESSION_VERSION, 'seed': self.seed})
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def clock(self) -> float:
+        now = self.base_clock()
+        self.times.append(now)
+        return now
+
+    def record(self, line):
+        self.write([line, self.times, rng_checksum(self.world), self.output_checksum])
+        self.times = []
+
+    def close(self):
+        if not self.file.closed:
+            self.io.flush()
+            self.record(None)
+            self.file.close()
+
+
+class SessionReplay(Session):
+    def __init__(self, path: str, sink=None, echo: bool = False):
+        with open(path, encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != SESSION_VERSION:
+                raise ReplayError(f'unsupported session version {header.get("version")!r}')
+            self.records = [json.loads(line) for line in f if line.strip()]
+        super().__init__(header['seed'])
+        self.sink = sink if sink is not None else TerminalSink()
+        self.io = ReplayIO(self, OutputBuffer(self.sink), echo)
+        self.position = 0
+        self.times = iter(self.records[0][1] if self.records else ())
+
+    def clock(self) -> float:
+        try:
+            return next(self.times)
+        except StopIteration:
+            raise ReplayError(f'clock read more often than recorded before input {self.position}') from None
+
+    def check_turn(self):
+        # The game must have read the clock as often as when it was recorded,
+        # be in the same RNG state and have written the same output
+        _, _, rng_state, output = self.records[self.position]
+        if next(self.times, None) is not None:
+            raise ReplayError(f'clock read less often than recorded before input {self.position}')
+        if rng_checksum(self.world) != rng_state:
+            raise ReplayError(f'RNG state differs from the recording at input {self.position}')
+        if self.output_checksum != output:
+            raise ReplayError(f'output differs from the recording before input {self.position}')
+
+    def next_input(self) -> str:
+        if self.position >= len(self.records) or self.records[self.position][0] is None:
+            raise EOFError('recorded session finished')
+        self.check_turn()
+        line = self.records[self.position][0]
+        self.position += 1
+        self.times = iter(self.records[self.position][1] if self.position < len(self.records) else ())
+        return line
+
+    def close(self):
+        self.io.flush()
+        if self.position < len(self.records) and self.records[self.position][0] is None:
+            self.check_turn()
+            self.position += 1
+        if self.position < len(self.records):
+            raise ReplayError(f'replay stopped at input {self.position} of {len(self.records) - 1}')
+
+
+def session_from_args(args: list[str]):
+    # <game> --record FILE [--seed N]  or  <game> --replay FILE
+    if len(args) >= 2 and args[0] == '--record':
+        seed = int(args[3]) if len(args) >= 4 and args[2] == '--seed' else None
+        return SessionRecorder(args[1], seed)
+    if len(args) >= 2 and args[0] == '--replay':
+        return SessionReplay(args[1], echo=True)
+    return None
@@ -0,0 +1,300 @@
+import os
+import io
+import sys
+import stat
+import struct
+import marshal
+import zlib
+import zipfile
+import threading
+import contextlib
+from collections import OrderedDict, namedtuple
+
+from pyinstxtractor import PyInstArchive
+
+# Read-only virtual filesystem over a PyInstaller executable.
+#
+# Layout (same as unpack_pyz.py writes to disk):
+#   /<CArchive member>                 e.g. /pyimod01_archive, /PYZ-00.pyz
+#   /<PYZ member>/<module name>        e.g. /PYZ-00.pyz/email._encoded_words
+#   /<zip member>/<path inside zip>    e.g. /base_library.zip/encodings/utf_8.pyc
+#
+# Archives (PYZ and zip) show up as directories. PYZ modules are returned as
+# marshalled code objects without a pyc header, like unpack_pyz.py does.
+# Nothing is decompressed until a file is opened, and recently opened members
+# are kept in a byte-budgeted LRU.
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+VFSStat = namedtuple("VFSStat", "st_mode st_size compressed_size kind")
+
+# Leaf kinds
+CARCHIVE = "carchive"
+PYZ = "pyz"
+ZIP = "zip"
+
+
+class Member:
+    # A file in the VFS and how to read it. size is the decompressed size,
+    # None until known (PYZ members don't record it)
+    def __init__(self, kind: str, size: int, compressed_size: int, source):
+        self.kind = kind
+        self.size = size
+        self.compressed_size = compressed_size
+        self.source = source
+
+
+class ArchiveVFS:
+    def __init__(self, exe_path: str, base_library: str = None, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.exe_path = exe_path
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+        self._tree = {}
+        self._members = {}  # CArchive member name -> Member, including mounted archives
+        self._zips = []     # Mounted zip files, closed with the VFS
+
+        self._archive = PyInstArchive(exe_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = (self._archive.open() and self._archive.checkFile()
+                  and self._archive.getCArchiveInfo() and self._archive.parseTOC())
+        if not ok:
+            self._archive.close()
+            raise OSError(f"{exe_path!r} is not a readable PyInstaller archive")
+
+        for entry in self._archive.tocList:
+            if entry.typeCmprsData in (b"d", b"o"):
+                # Runtime options, not files
+                continue
+            member = Member(CARCHIVE, entry.uncmprsdDataSize, entry.cmprsdDataSize, entry)
+            self._members[entry.name] = member
+            self._add(entry.name, member)
+
+            if entry.typeCmprsData in (b"z", b"Z"):
+                self._mount_pyz(entry.name)
+            elif entry.name.endswith(".zip"):
+                self._mount_zip(entry.name, io.BytesIO(self._load("/" + entry.name, member)))
+
+        # onedir builds keep base_library.zip next to the executable
+        if base_library is None:
+            base_library = os.path.join(os.path.dirname(os.path.abspath(exe_path)), "base_library.zip")
+        if os.path.isfile(base_library) and "base_library.zip" not in self._tree:
+            self._mount_zip("base_library.zip", base_library)
+
+    def close(self):
+        for zip_file in self._zips:
+            zip_file.close()
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- tree building -------------------------------------------------
+
+    def _add(self, path: str, node, replace: bool = False):
+        parts = [p for p in path.replace("\\", "/").split("/") if p]
+        directory = self._tree
+        for part in parts[:-1]:
+            child = directory.setdefault(part, {})
+            if not isinstance(child, dict):
+                # A file and a directory with the same name; keep the file
+                return
+            directory = child
+        if parts and (replace or parts[-1] not in directory):
+            directory[parts[-1]] = node
+
+    def _mount_pyz(self, name: str):
+        # The PYZ member is replaced by a directory of its modules. A stored
+        # PYZ only needs its header and TOC read, not the whole payload.
+        entry = self._members[name].source
+        if entry.cmprsFlag == 0:
+            header = self._read_exe(entry.position, 12)
+        else:
+            data = self._load("/" + name, self._members[name])
+            header = data[:12]
+        if len(header) < 12 or header[:4] != b"PYZ\0":
+            return
+        (toc_offset,) = struct.unpack("!i", header[8:12])
+        if entry.cmprsFlag == 0:
+            toc_data = self._read_exe(entry.position + toc_offset, entry.cmprsdDataSize - toc_offset)
+        else:
+            toc_data = data[toc_offset:]
+        try:
+            toc = marshal.loads(toc_data)
+        except (EOFError, ValueError, TypeError):
+            return
+        pyz_dir = {}
+        for module_name, (typecode, pos, length) in dict(toc).items():
+            if isinstance(module_name, bytes):
+                module_name = module_name.decode("utf-8")
+            # The size is only known once decompressed, see stat()
+            pyz_dir[module_name] = Member(PYZ, None, length, (name, pos, length))
+        self._add(name, pyz_dir, replace=True)
+
+    def _mount_zip(self, name: str, file):
+        zip_file = zipfile.ZipFile(file)
+        self._zips.append(zip_file)
+        zip_dir = {}
+        self._add(name, zip_dir, replace=True)
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+            parts = info.filename.split("/")
+            directory = zip_dir
+            for part in parts[:-1]:
+                directory = directory.setdefault(part, {})
+            directory[parts[-1]] = Member(ZIP, info.file_size, info.compress_size, (zip_file, info.filename))
+
+    # --- lookups ---------------------------------------------------------
+
+    def _lookup(self, path: str):
+        node = self._tree
+        for part in [p for p in path.replace("\\", "/").split("/") if p]:
+            if not isinstance(node, dict) or part not in node:
+                raise FileNotFoundError(path)
+            node = node[part]
+        return node
+
+    def _read_exe(self, position: int, size: int) -> bytes:
+        f = self._archive.fPtr
+        f.seek(position, os.SEEK_SET)
+        return f.read(size)
+
+    def _load(self, path: str, member: Member) -> bytes:
+        # Decompress a member, going through the LRU
+        with self._lock:
+            data = self._cache.get(path)
+            if data is not None:
+                self._cache.move_to_end(path)
+                return data
+
+        if member.kind == CARCHIVE:
+            entry = member.source
+            with self._lock:
+                data = self._read_exe(entry.position, entry.cmprsdDataSize)
+            if entry.cmprsFlag == 1:
+                data = zlib.decompress(data)
+
+        elif member.kind == PYZ:
+            # Read straight from the exe when the PYZ is stored, otherwise
+            # slice the (cached) decompressed PYZ
+            pyz_name, pos, length = member.source
+            pyz_member = self._members[pyz_name]
+            entry = pyz_member.source
+            if entry.cmprsFlag == 0:
+                with self._lock:
+                    raw = self._read_exe(entry.position + pos, length)
+            else:
+                raw = self._load("/" + pyz_name, pyz_member)[pos:pos + length]
+            data = zlib.decompress(raw)
+            member.size = len(data)
+
+        else:
+            zip_file, filename = member.source
+            with self._lock:
+                data = zip_file.read(filename)
+
+        self._remember(path, data)
+        return data
+
+    def _remember(self, path: str, data: bytes):
+        if len(data) > self.cache_bytes:
+            return
+        with self._lock:
+            if path in self._cache:
+                return
+            self._cache[path] = data
+            self._cache_size += len(data)
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted)
+
+    # --- public API --------------------------------------------------------
+
+    def listdir(self, path: str = "/") -> list:
+        node = self._lookup(path)
+        if not isinstance(node, dict):
+            raise NotADirectoryError(path)
+        return sorted(node.keys())
+
+    def stat(self, path: str) -> VFSStat:
+        node = self._lookup(path)
+        if isinstance(node, dict):
+            return VFSStat(stat.S_IFDIR | 0o555, 0, 0, "dir")
+        if node.size is None:
+            # Decompressing sets it, and leaves the data in the LRU for a read
+            self._load("/" + path.replace("\\", "/").strip("/"), node)
+        return VFSStat(stat.S_IFREG | 0o444, node.size, node.compressed_size, node.kind)
+
+    def kind(self, path: str) -> str:
+        # Like stat(path).kind, without decompressing PYZ members for their size
+        node = self._lookup(path)
+        return "dir" if isinstance(node, dict) else node.kind
+
+    def isdir(self, path: str) -> bool:
+        try:
+            return isinstance(self._lookup(path), dict)
+        except FileNotFoundError:
+            return False
+
+    def open(self, path: str, mode: str = "rb"):
+        if mode not in ("r", "rb"):
+            raise PermissionError(f"{path!r}: the archive filesystem is read-only")
+        node = self._lookup(path)
+        if isinstance(node, dict):
+            raise IsADirectoryError(path)
+        return io.BytesIO(self._load("/" + path.replace("\\", "/").strip("/"), node))
+
+    def read_compressed(self, path: str) -> bytes:
+        # The member's bytes as stored (compressed), without caching; useful
+        # for cheap change detection
+        node = self._lookup(path)
+        if isinstance(node, dict):
+            raise IsADirectoryError(path)
+        if node.kind == CARCHIVE:
+            entry = node.source
+            with self._lock:
+                return self._read_exe(entry.position, entry.cmprsdDataSize)
+        if node.kind == PYZ:
+            pyz_name, pos, length = node.source
+            pyz_member = self._members[pyz_name]
+            entry = pyz_member.source
+            if entry.cmprsFlag == 0:
+                with self._lock:
+                    return self._read_exe(entry.position + pos, length)
+            return self._load("/" + pyz_name, pyz_member)[pos:pos + length]
+        raise io.UnsupportedOperation(f"{path!r}: stored bytes of zip members are not available")
+
+    def walk(self, top: str = "/"):
+        # Same shape as os.walk: (dirpath, dirnames, filenames), top-down
+        node = self._lookup(top)
+        if not isinstance(node, dict):
+            return
+        top = "/" + top.replace("\\", "/").strip("/")
+        dirnames = sorted(name for name, child in node.items() if isinstance(child, dict))
+        filenames = sorted(name for name, child in node.items() if not isinstance(child, dict))
+        yield top, dirnames, filenames
+        for name in dirnames:
+            yield from self.walk(top.rstrip("/") + "/" + name)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("[+] Usage: archive_vfs.py <exe> [path]")
+        sys.exit(1)
+
+    with ArchiveVFS(sys.argv[1]) as vfs:
+        top = sys.argv[2] if len(sys.argv) > 2 else "/"
+        for dirpath, dirnames, filenames in vfs.walk(top):
+            for name in filenames:
+                path = dirpath.rstrip("/") + "/" + name
+                st = vfs.stat(path)
+                print(f"{st.st_size:10} {st.compressed_size:10} {st.kind:8} {path}")
+
+
+if __name__ == "__main__":
+    main()
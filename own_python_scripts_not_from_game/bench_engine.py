@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import pickle
+import tempfile
+
+from world_gen import generate_world, count_entities
+from game_output import MemorySink
+from game_io import ScriptedIO
+from session_record import SessionReplay
+import adventure
+
+# Timings of the entity engine's hot paths on generated worlds, so scaling
+# regressions show up as numbers. Each benchmark is run REPEAT times and the
+# best run is reported, per operation. Recorded sessions (see
+# decompiled_to_py/session_record.py) are replayed exactly, so they time the
+# same playthrough on every run.
+
+REPEAT = 3
+
+# (rooms, items per room, inventory, depth)
+DEFAULT_CONFIGS = [
+    (7, 4, 2, 1),         # About the size of the real game
+    (100, 20, 20, 2),
+    (1000, 50, 100, 2),
+]
+
+
+def log(msg: str):
+    print(msg)
+
+
+def best_of(fn, number: int) -> float:
+    # Seconds per call, best of REPEAT runs of number calls
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_set_parent(world):
+    # Move every inventory item to the room and back
+    player = world.player
+    room = player.parent
+    items = list(player.children)
+
+    def run():
+        for item in items:
+            item.set_parent(room)
+        for item in items:
+            item.set_parent(player)
+
+    return best_of(run, 10) / max(2 * len(items), 1)
+
+
+def bench_get_options(world):
+    rooms = list(world.rooms.values())
+    return best_of(lambda: [room.get_options() for room in rooms], 3) / len(rooms)
+
+
+def bench_cached_options(world):
+    # Nothing changes between turns here, so this is the memoised path
+    rooms = list(world.rooms.values())
+    return best_of(lambda: [room.cached_options() for room in rooms], 3) / len(rooms)
+
+
+def bench_get_description(world):
+    rooms = list(world.rooms.values())
+    return best_of(lambda: [room.get_description() for room in rooms], 3) / len(rooms)
+
+
+def bench_look_at(world):
+    player = world.player
+    names = [child.name for child in player.parent.children if child is not player]
+    names += [child.name for child in player.children]
+
+    # Collect the output in memory, so only the engine is timed
+    sink = MemorySink()
+    player.io = ScriptedIO([], sink)
+
+    def run():
+        for name in names:
+            player.look_at(name)
+        player.io.flush()
+        sink.clear()
+
+    return best_of(run, 3) / max(len(names), 1)
+
+
+def bench_save_load(world):
+    # Same as adventure.save/load: pickle to a file and back
+    fd, path = tempfile.mkstemp(suffix=".game")
+    os.close(fd)
+
+    def run():
+        with open(path, "wb") as f:
+            pickle.dump(world, f)
+        with open(path, "rb") as f:
+            pickle.load(f)
+
+    try:
+        return best_of(run, 1)
+    finally:
+        os.remove(path)
+
+
+BENCHMARKS = [
+    ("set_parent", bench_set_parent, "per move"),
+    ("get_options", bench_get_options, "per room"),
+    ("cached_options", bench_cached_options, "per room"),
+    ("get_description", bench_get_description, "per room"),
+    ("look_at", bench_look_at, "per lookup"),
+    ("save/load", bench_save_load, "per world"),
+]
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:9.1f} ms"
+    return f"{seconds:9.2f} s "
+
+
+def run_config(rooms: int, items_per_room: int, inventory: int, depth: int):
+    start = time.perf_counter()
+    world = generate_world(rooms=rooms, items_per_room=items_per_room, inventory=inventory, depth=depth)
+    elapsed = time.perf_counter() - start
+    log(f"[+] {rooms} rooms, {items_per_room} items/room, {inventory} in inventory, depth {depth}:"
+        f" {count_entities(world)} entities, generated in {elapsed:.2f}s")
+    for name, bench, unit in BENCHMARKS:
+        log(f"    {name:16} {format_time(bench(world))} {unit}")
+
+
+def run_replay(path: str):
+    def run():
+        session = SessionReplay(path, MemorySink())
+        try:
+            adventure.play(session=session)
+        except EOFError:
+            pass
+        session.close()
+
+    # Replayed sessions do not save (see adventure.play)
+    log(f"[+] Replay of {path}: {format_time(best_of(run, 1))} per playthrough")
+
+
+def main():
+    # Optional configs as rooms,items_per_room,inventory,depth, e.g. 100,20,20,2,
+    # and recorded session files to replay
+    configs = [tuple(int(n) for n in arg.split(",")) for arg in sys.argv[1:] if not os.path.isfile(arg)]
+    sessions = [arg for arg in sys.argv[1:] if os.path.isfile(arg)]
+    for config in configs or ([] if sessions else DEFAULT_CONFIGS):
+        run_config(*config)
+    for path in sessions:
+        run_replay(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import sys
+import dis
+import json
+import time
+import types
+
+import numpy as np
+
+import deassemble_pyz_content as dis_dump
+
+# Triage statistics over every code object in the bundle: opcode histograms,
+# instruction counts, constant types and string entropy, per module and for
+# the whole bundle. All bytecode is decoded into one array up front, so every
+# statistic is a handful of vectorised NumPy operations.
+
+STATS_PATH = os.path.join("decompiled_to_py", "PYZ-00.pyz_stats.json")
+
+# Strings/bytes shorter than this are not scored (their entropy is capped at
+# log2(len) anyway)
+MIN_ENTROPY_LENGTH = 32
+# Bits per byte; English text is around 4.2, base64 6, random bytes close to 8
+HIGH_ENTROPY = 5.5
+# Strings are scored this many at a time, to bound the (n, 256) count matrix
+ENTROPY_BATCH = 4096
+
+TOP_N = 10
+
+CACHE = dis.opmap["CACHE"]
+
+
+def log(msg: str):
+    print(msg)
+
+
+def iter_code_objects(code: types.CodeType):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def collect(modules):
+    # Flatten the bundle into arrays: all co_code bytes with the module index
+    # of every instruction, and every constant's type and (for str/bytes)
+    # encoded bytes
+    names = []
+    code_chunks = []
+    code_lengths = []
+    code_objects = []
+    const_types = []
+    const_modules = []
+    strings = []
+    string_modules = []
+
+    for module_rel_path, code in modules:
+        if code is None:
+            continue
+        index = len(names)
+        # PYZ members are named after the module and have no extension, so
+        # unlike deassemble_pyz_content no splitext ("email._encoded_words")
+        names.append(module_rel_path.replace(os.sep, "."))
+        n_code = 0
+        for child in iter_code_objects(code):
+            n_code += 1
+            code_chunks.append(child.co_code)
+            code_lengths.append(len(child.co_code) // 2)
+            for const in child.co_consts:
+                const_types.append(type(const).__name__)
+                const_modules.append(index)
+                if isinstance(const, str):
+                    const = const.encode("utf-8", "surrogatepass")
+                if isinstance(const, bytes) and len(const) >= MIN_ENTROPY_LENGTH:
+                    strings.append(const)
+                    string_modules.append(index)
+        code_objects.append(n_code)
+
+    # Wordcode: even bytes are opcodes, odd bytes their arguments
+    words = np.frombuffer(b"".join(code_chunks), dtype=np.uint8).reshape(-1, 2)
+    per_code_module = np.repeat(np.arange(len(names)), code_objects)
+    instr_module = np.repeat(per_code_module, code_lengths)
+
+    return {
+        "names": names,
+        "opcodes": words[:, 0],
+        "instr_module": instr_module,
+        "code_objects": np.asarray(code_objects),
+        "const_types": const_types,
+        "const_modules": np.asarray(const_modules, dtype=np.intp),
+        "strings": strings,
+        "string_modules": np.asarray(string_modules, dtype=np.intp),
+    }
+
+
+def opcode_histograms(opcodes: np.ndarray, instr_module: np.ndarray, n_modules: int) -> np.ndarray:
+    # (n_modules, 256) opcode counts; inline CACHE entries are not instructions
+    real = opcodes != CACHE
+    flat = instr_module[real] * 256 + opcodes[real]
+    return np.bincount(flat, minlength=n_modules * 256).reshape(n_modules, 256)
+
+
+def const_type_counts(const_types: list, const_modules: np.ndarray, n_modules: int):
+    type_names, type_ids = np.unique(np.asarray(const_types, dtype=object).astype(str), return_inverse=True)
+    flat = const_modules * len(type_names) + type_ids
+    counts = np.bincount(flat, minlength=n_modules * len(type_names)).reshape(n_modules, len(type_names))
+    return list(type_names), counts
+
+
+def shannon_entropy(blobs: list) -> np.ndarray:
+    # Bits per byte of every blob, ENTROPY_BATCH blobs per bincount
+    result = np.empty(len(blobs))
+    for start in range(0, len(blobs), ENTROPY_BATCH):
+        batch = blobs[start:start + ENTROPY_BATCH]
+        lengths = np.fromiter((len(b) for b in batch), dtype=np.intp, count=len(batch))
+        data = np.frombuffer(b"".join(batch), dtype=np.uint8)
+        owner = np.repeat(np.arange(len(batch)), lengths)
+        counts = np.bincount(owner * 256 + data, minlength=len(batch) * 256).reshape(len(batch), 256)
+        p = counts / lengths[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terms = np.where(counts > 0, p * np.log2(p), 0.0)
+        result[start:start + len(batch)] = -terms.sum(axis=1)
+    return result
+
+
+def analyse(data: dict) -> dict:
+    names = data["names"]
+    n = len(names)
+
+    hist = opcode_histograms(data["opcodes"], data["instr_module"], n)
+    instr_counts = hist.sum(axis=1)
+    bundle_hist = hist.sum(axis=0)
+
+    type_names, type_counts = const_type_counts(data["const_types"], data["const_modules"], n)
+
+    entropy = shannon_entropy(data["strings"])
+    string_modules = data["string_modules"]
+    scored = np.bincount(string_modules, minlength=n)
+    high = np.bincount(string_modules[entropy >= HIGH_ENTROPY], minlength=n)
+    max_entropy = np.zeros(n)
+    np.maximum.at(max_entropy, string_modules, entropy)
+
+    def top_opcodes(counts: np.ndarray) -> dict:
+        order = np.argsort(counts)[::-1][:TOP_N]
+        return {dis.opname[op]: int(counts[op]) for op in order if counts[op]}
+
+    modules = {}
+    for i, name in enumerate(names):
+        modules[name] = {
+            "code_objects": int(data["code_objects"][i]),
+            "instructions": int(instr_counts[i]),
+            "top_opcodes": top_opcodes(hist[i]),
+            "const_types": {t: int(c) for t, c in zip(type_names, type_counts[i]) if c},
+            "strings_scored": int(scored[i]),
+            "high_entropy_strings": int(high[i]),
+            "max_string_entropy": round(float(max_entropy[i]), 3),
+        }
+
+    return {
+        "bundle": {
+            "modules": n,
+            "code_objects": int(data["code_objects"].sum()),
+            "instructions": int(instr_counts.sum()),
+            "opcodes": {dis.opname[op]: int(c) for op, c in enumerate(bundle_hist) if c},
+            "const_types": {t: int(c) for t, c in zip(type_names, type_counts.sum(axis=0))},
+            "strings_scored": len(entropy),
+            "high_entropy_strings": int((entropy >= HIGH_ENTROPY).sum()),
+        },
+        "suspicious_modules": [names[i] for i in np.argsort(max_entropy)[::-1] if high[i]],
+        "modules": modules,
+    }
+
+
+def print_report(report: dict):
+    bundle = report["bundle"]
+    log(f"[+] {bundle['modules']} modules, {bundle['code_objects']} code objects, {bundle['instructions']} instructions")
+    top = sorted(bundle["opcodes"].items(), key=lambda item: -item[1])[:TOP_N]
+    log("[+] Most common opcodes: " + ", ".join(f"{op} {count}" for op, count in top))
+    log("[+] Constants: " + ", ".join(f"{t} {c}" for t, c in sorted(bundle["const_types"].items(), key=lambda item: -item[1])))
+    log(f"[+] {bundle['high_entropy_strings']} of {bundle['strings_scored']} strings >= {HIGH_ENTROPY} bits/byte")
+    for name in report["suspicious_modules"][:TOP_N]:
+        module = report["modules"][name]
+        log(f"    [!] {name}: {module['high_entropy_strings']} high-entropy strings, max {module['max_string_entropy']}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--exe":
+        from archive_vfs import ArchiveVFS
+        modules = dis_dump.iter_modules_in_exe(ArchiveVFS(sys.argv[2]))
+    elif not os.path.isdir(dis_dump.PYZ_ROOT):
+        log(f"[-] PYZ_ROOT directory {dis_dump.PYZ_ROOT!r} not found.")
+        sys.exit(1)
+    else:
+        modules = dis_dump.iter_modules_on_disk()
+
+    data = collect(modules)
+    start = time.perf_counter()
+    report = analyse(data)
+    elapsed = time.perf_counter() - start
+
+    print_report(report)
+    os.makedirs(os.path.dirname(STATS_PATH) or ".", exist_ok=True)
+    with open(STATS_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    log(f"[+] Statistics computed in {elapsed:.3f}s, written to {STATS_PATH!r}")
+
+
+if __name__ == "__main__":
+    main()
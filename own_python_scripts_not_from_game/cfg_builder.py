@@ -0,0 +1,178 @@
+import os
+import sys
+import dis
+import json
+import types
+import marshal
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import deassemble_pyz_content as dis_dump
+
+# Output root for the control-flow graphs, one .cfg.json and one .dot per code object
+CFG_ROOT = os.path.join("decompiled_to_py", "PYZ-00.pyz_cfg")
+# CFGs keyed by code object hash, so unchanged code is never analysed twice
+CACHE_DIR = os.path.join(CFG_ROOT, ".cache")
+
+# Python 3.11 branch instructions
+UNCONDITIONAL_JUMPS = {
+    "JUMP_FORWARD", "JUMP_BACKWARD", "JUMP_BACKWARD_NO_INTERRUPT", "JUMP_ABSOLUTE", "JUMP",
+}
+BLOCK_TERMINATORS = {"RETURN_VALUE", "RETURN_CONST", "RAISE_VARARGS", "RERAISE"}
+
+
+def log(msg: str):
+    print(msg)
+
+
+def code_hash(code: types.CodeType) -> str:
+    return hashlib.sha256(marshal.dumps(code)).hexdigest()
+
+
+def is_jump(instr: dis.Instruction) -> bool:
+    return instr.opcode in dis.hasjrel or instr.opcode in dis.hasjabs
+
+
+def build_cfg(code: types.CodeType) -> dict:
+    # Split the bytecode into basic blocks and connect them with
+    # fallthrough, jump and exception edges
+    bc = dis.Bytecode(code)
+    instructions = list(bc)
+    exception_entries = getattr(bc, "exception_entries", [])
+    if not instructions:
+        return {"name": code.co_qualname if hasattr(code, "co_qualname") else code.co_name, "blocks": []}
+
+    # Leaders: first instruction, jump targets, instructions after a branch
+    # or terminator, and exception handlers
+    leaders = {instructions[0].offset}
+    for i, instr in enumerate(instructions):
+        if is_jump(instr):
+            leaders.add(instr.argval)
+        if (is_jump(instr) or instr.opname in BLOCK_TERMINATORS) and i + 1 < len(instructions):
+            leaders.add(instructions[i + 1].offset)
+    for entry in exception_entries:
+        leaders.add(entry.target)
+        # Protected ranges start and end on block boundaries too
+        leaders.add(entry.start)
+        if entry.end <= instructions[-1].offset:
+            leaders.add(entry.end)
+
+    blocks = []
+    current = None
+    for instr in instructions:
+        if instr.offset in leaders or current is None:
+            current = {"start": instr.offset, "end": instr.offset, "instructions": [], "successors": []}
+            blocks.append(current)
+        current["end"] = instr.offset
+        current["instructions"].append({
+            "offset": instr.offset,
+            "opname": instr.opname,
+            "argrepr": instr.argrepr,
+            "line": instr.positions.lineno if getattr(instr, "positions", None) else instr.starts_line,
+        })
+
+    block_starts = [block["start"] for block in blocks]
+    by_offset = {instr.offset: instr for instr in instructions}
+    for i, block in enumerate(blocks):
+        last = by_offset[block["end"]]
+        next_start = block_starts[i + 1] if i + 1 < len(blocks) else None
+        if is_jump(last):
+            block["successors"].append({"target": last.argval, "kind": "jump"})
+            if last.opname not in UNCONDITIONAL_JUMPS and next_start is not None:
+                block["successors"].append({"target": next_start, "kind": "fallthrough"})
+        elif last.opname not in BLOCK_TERMINATORS and next_start is not None:
+            block["successors"].append({"target": next_start, "kind": "fallthrough"})
+
+        # Any block inside a protected range can continue at its handler
+        for entry in exception_entries:
+            if entry.start <= block["start"] < entry.end:
+                block["successors"].append({"target": entry.target, "kind": "exception", "depth": entry.depth})
+
+    return {
+        "name": code.co_qualname if hasattr(code, "co_qualname") else code.co_name,
+        "firstlineno": code.co_firstlineno,
+        "blocks": blocks,
+    }
+
+
+def cached_cfg(code: types.CodeType) -> dict:
+    cache_path = os.path.join(CACHE_DIR, code_hash(code) + ".json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    cfg = build_cfg(code)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f)
+    os.replace(tmp_path, cache_path)
+    return cfg
+
+
+def cfg_to_dot(cfg: dict, qualified_name: str) -> str:
+    lines = [f"digraph {json.dumps(qualified_name)} {{", '  node [shape=box, fontname="monospace"];']
+    for block in cfg["blocks"]:
+        body = "\\l".join(f"{i['offset']:4}: {i['opname']} {i['argrepr']}".replace('"', '\\"') for i in block["instructions"])
+        lines.append(f'  b{block["start"]} [label="{body}\\l"];')
+    style = {"jump": "solid", "fallthrough": "dashed", "exception": "dotted"}
+    for block in cfg["blocks"]:
+        for succ in block["successors"]:
+            lines.append(f'  b{block["start"]} -> b{succ["target"]} [style={style[succ["kind"]]}, label="{succ["kind"]}"];')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def iter_code_objects(code: types.CodeType, qualified_name: str):
+    # Same naming as deassemble_pyz_content.walk_code_object
+    yield code, qualified_name
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const, f"{qualified_name}.{const.co_name}")
+
+
+def process_module(module_rel_path: str, data: bytes) -> int:
+    # Worker: build, cache and export the CFG of every code object in a module
+    code = marshal.loads(data)
+    mod_name = os.path.splitext(module_rel_path)[0].replace(os.sep, ".")
+    out_dir = os.path.join(CFG_ROOT, os.path.splitext(module_rel_path)[0])
+    os.makedirs(out_dir, exist_ok=True)
+
+    count = 0
+    for child, qualified_name in iter_code_objects(code, mod_name):
+        cfg = cached_cfg(child)
+        base = os.path.join(out_dir, dis_dump.safe_name(qualified_name))
+        with open(base + ".cfg.json", "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=1)
+        with open(base + ".dot", "w", encoding="utf-8") as f:
+            f.write(cfg_to_dot(cfg, qualified_name))
+        count += 1
+    return count
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--exe":
+        from archive_vfs import ArchiveVFS
+        modules = dis_dump.iter_modules_in_exe(ArchiveVFS(sys.argv[2]))
+    elif not os.path.isdir(dis_dump.PYZ_ROOT):
+        log(f"[-] PYZ_ROOT directory {dis_dump.PYZ_ROOT!r} not found.")
+        sys.exit(1)
+    else:
+        modules = dis_dump.iter_modules_on_disk()
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    with ProcessPoolExecutor() as pool:
+        jobs = [
+            pool.submit(process_module, module_rel_path, marshal.dumps(code))
+            for module_rel_path, code in modules
+            if code is not None
+        ]
+        total = sum(job.result() for job in jobs)
+
+    log(f"[+] Done. {total} control-flow graphs written under {CFG_ROOT!r}")
+
+
+if __name__ == "__main__":
+    main()
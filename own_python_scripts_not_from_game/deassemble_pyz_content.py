@@ -1,14 +1,35 @@
 import os
 import sys
+import json
+import math
+import hashlib
 import marshal
 import dis
 import types
+from functools import partial
 
 PYZ_ROOT = os.path.join("TheFactory.exe_extracted\PYZ-00.pyz_extracted", "PYZ-00.pyz")
 
 # Output root directory for human-readable disassembly files
 OUT_ROOT = "decompiled_to_py\PYZ-00.pyz_content"
 
+# Machine-readable output (--jsonl): one JSON record per code object, each
+# followed by one record per instruction
+JSONL_PATH = os.path.join(OUT_ROOT, "disassembly.jsonl")
+JSONL_BUFFER_SIZE = 1 << 20
+
+# Constants whose repr is longer than this are written once to the constant
+# pool (one file per unique constant) and referenced as <const ID> instead
+CONST_POOL_DIR = os.path.join(OUT_ROOT, "_consts")
+CONST_INLINE_LIMIT = 200
+
+# IDs already in the pool during this run
+_pooled_consts = set()
+
+# Nested code objects with an identical body (same bytecode and constants,
+# names and line numbers ignored) are dumped once; the others are listed here
+ALIAS_PATH = os.path.join(OUT_ROOT, "aliases.json")
+
 
 def log(msg: str):
     print(msg)
@@ -23,6 +44,11 @@ def try_load_code_object(path: str):
         log(f"[!] Could not read {path!r}: {e}")
         return None
 
+    return load_code_object(data, path)
+
+
+def load_code_object(data: bytes, path: str):
+    # Unmarshal a code object from bytes; path is only used for messages
     try:
         obj = marshal.loads(data)
     except Exception as e:
@@ -43,6 +69,31 @@ def safe_name(name: str) -> str:
         name = name.replace(ch, "_")
     return name
 
+def pool_repr(text: str) -> str:
+    # Return text itself if short, else move it to the constant pool and
+    # return a reference; identical constants share one pool entry
+    if len(text) <= CONST_INLINE_LIMIT:
+        return text
+
+    const_id = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+    if const_id not in _pooled_consts:
+        _pooled_consts.add(const_id)
+        pool_path = os.path.join(CONST_POOL_DIR, const_id + ".txt")
+        if not os.path.exists(pool_path):
+            os.makedirs(CONST_POOL_DIR, exist_ok=True)
+            with open(pool_path, "w", encoding="utf-8", errors="surrogatepass") as f:
+                f.write(text)
+    return f"<const {const_id}>"
+
+
+def consts_repr(consts: tuple) -> str:
+    # repr(co_consts) with the large members replaced by pool references
+    items = [pool_repr(repr(const)) for const in consts]
+    if len(items) == 1:
+        return f"({items[0]},)"
+    return "(" + ", ".join(items) + ")"
+
+
     # Write a readable disassembly of a single code object to a .dis.txt file
     # One file per function/code object to keep it small and focused
 def dump_code_object(code: types.CodeType, qualified_name: str, module_rel_path: str):
@@ -62,7 +113,7 @@ def dump_code_object(code: types.CodeType, qualified_name: str, module_rel_path:
         out.write(f"# From module file: {module_rel_path}\n\n")
 
         out.write("## co_consts:\n")
-        out.write(repr(code.co_consts))
+        out.write(consts_repr(code.co_consts))
         out.write("\n\n## co_names:\n")
         out.write(repr(code.co_names))
         out.write("\n\n## bytecode:\n\n")
@@ -70,26 +121,118 @@ def dump_code_object(code: types.CodeType, qualified_name: str, module_rel_path:
         # Use dis.Bytecode for nicer, structured output
         bc = dis.Bytecode(code)
         for instr in bc:
-            out.write(f"{instr.offset:4}: {instr.opname:20} {instr.argrepr}\n")
+            out.write(f"{instr.offset:4}: {instr.opname:20} {pool_repr(instr.argrepr)}\n")
+
+
+def json_value(value, qualified_name: str):
+    # JSON has no tuples, bytes, NaN...; fall back to repr for those. Nested
+    # code objects of qualified_name become a reference to their own "code"
+    # record, large constants a reference into the constant pool.
+    if isinstance(value, types.CodeType):
+        return {"code_ref": f"{qualified_name}.{value.co_name}"}
+    if value is None or isinstance(value, (bool, int)) or (isinstance(value, float) and math.isfinite(value)):
+        return value
+    text = repr(value)
+    pooled = pool_repr(text)
+    if pooled != text:
+        return {"const_ref": pooled[len("<const "):-1]}
+    return value if isinstance(value, str) else text
+
+
+def dump_code_object_jsonl(code: types.CodeType, qualified_name: str, module_rel_path: str, out):
+    # Write one "code" record and one "instr" record per instruction to out
+    bc = dis.Bytecode(code)
+    exception_entries = getattr(bc, "exception_entries", [])
+
+    out.write(json.dumps({
+        "type": "code",
+        "qualname": qualified_name,
+        "module": module_rel_path,
+        "co_name": code.co_name,
+        "filename": code.co_filename,
+        "firstlineno": code.co_firstlineno,
+        "argcount": code.co_argcount,
+        "flags": code.co_flags,
+        "consts": [json_value(const, qualified_name) for const in code.co_consts],
+        "names": list(code.co_names),
+        "varnames": list(code.co_varnames),
+        "exception_table": [
+            {"start": e.start, "end": e.end, "target": e.target, "depth": e.depth, "lasti": e.lasti}
+            for e in exception_entries
+        ],
+    }))
+    out.write("\n")
+
+    for instr in bc:
+        positions = getattr(instr, "positions", None)
+        line = positions.lineno if positions is not None else instr.starts_line
+        is_jump = instr.opcode in dis.hasjrel or instr.opcode in dis.hasjabs
+        out.write(json.dumps({
+            "type": "instr",
+            "qualname": qualified_name,
+            "offset": instr.offset,
+            "opname": instr.opname,
+            "opcode": instr.opcode,
+            "arg": instr.arg,
+            "argval": json_value(instr.argval, qualified_name),
+            "argval_type": type(instr.argval).__name__,
+            "argrepr": pool_repr(instr.argrepr),
+            "line": line,
+            "is_jump_target": instr.is_jump_target,
+            "jump_target": instr.argval if is_jump else None,
+        }))
+        out.write("\n")
+
+
+def normalized_code(code: types.CodeType) -> types.CodeType:
+    # The same code object without names, file name and line table, so that
+    # e.g. two lambdas with the same body compare equal
+    consts = tuple(
+        normalized_code(const) if isinstance(const, types.CodeType) else const
+        for const in code.co_consts
+    )
+    return code.replace(
+        co_name="", co_qualname="", co_filename="", co_firstlineno=1, co_linetable=b"", co_consts=consts,
+    )
 
 
-def walk_code_object(code: types.CodeType, qualified_name: str, module_rel_path: str):
+def body_hash(code: types.CodeType) -> str:
+    return hashlib.sha256(marshal.dumps(normalized_code(code))).hexdigest()
+
+
+def walk_code_object(code: types.CodeType, qualified_name: str, module_rel_path: str, dump=dump_code_object, seen=None):
     # Recursively walk a code object and all nested code objects (functions, methods, lambdas, comprehensions, etc.), dumping each one
-    dump_code_object(code, qualified_name, module_rel_path)
+    # With seen (body hash -> (qualified name, module)), a nested code object
+    # whose body was already dumped is recorded as an alias instead; its own
+    # nested code objects are identical too, so they are skipped with it
+    dump(code, qualified_name, module_rel_path)
 
     for const in code.co_consts:
         if isinstance(const, types.CodeType):
             child_qual = f"{qualified_name}.{const.co_name}"
-            walk_code_object(const, child_qual, module_rel_path)
+            if seen is not None:
+                key = body_hash(const)
+                if key in seen:
+                    seen["aliases"].append((child_qual, module_rel_path, *seen[key]))
+                    continue
+                seen[key] = (child_qual, module_rel_path)
+            walk_code_object(const, child_qual, module_rel_path, dump, seen)
 
 
-def main():
-    if not os.path.isdir(PYZ_ROOT):
-        log(f"[-] PYZ_ROOT directory {PYZ_ROOT!r} not found.")
-        sys.exit(1)
+def write_aliases(seen: dict):
+    # One entry per skipped code object and where its body was dumped. A list,
+    # since qualified names are not unique (e.g. several <genexpr> in a module)
+    aliases = [
+        {"qualname": alias, "module": module, "same_as": target, "same_as_module": target_module}
+        for alias, module, target, target_module in seen["aliases"]
+    ]
+    with open(ALIAS_PATH, "w", encoding="utf-8") as f:
+        json.dump(aliases, f, indent=1)
+    log(f"[+] {len(aliases)} duplicate code objects listed in {ALIAS_PATH}")
 
-    os.makedirs(OUT_ROOT, exist_ok=True)
 
+def iter_modules_on_disk():
+    # (module_rel_path, code object) for every file under PYZ_ROOT
     for dirpath, dirnames, filenames in os.walk(PYZ_ROOT):
         for name in filenames:
             full_path = os.path.join(dirpath, name)
@@ -97,15 +240,67 @@ def main():
             module_rel_path = os.path.relpath(full_path, PYZ_ROOT)
 
             log(f"[*] Processing {module_rel_path}")
+            yield module_rel_path, try_load_code_object(full_path)
+
 
-            code = try_load_code_object(full_path)
-            if code is None:
+def iter_modules_in_exe(vfs):
+    # Same, but read lazily from the PYZ archives inside the executable,
+    # without an extracted tree on disk. Closes vfs once done with it.
+    with vfs:
+        for pyz_name in vfs.listdir("/"):
+            if not vfs.isdir(pyz_name):
                 continue
+            for dirpath, dirnames, filenames in vfs.walk(pyz_name):
+                for name in filenames:
+                    path = f"{dirpath}/{name}"
+                    if vfs.kind(path) != "pyz":
+                        continue
+                    module_rel_path = os.path.relpath(path, "/" + pyz_name).replace("/", os.sep)
+
+                    log(f"[*] Processing {path}")
+                    with vfs.open(path) as f:
+                        yield module_rel_path, load_code_object(f.read(), path)
+
+
+def main():
+    args = sys.argv[1:]
+    jsonl = "--jsonl" in args
+    if jsonl:
+        args.remove("--jsonl")
+
+    if len(args) > 1 and args[0] == "--exe":
+        # Read straight from the executable through the archive VFS
+        from archive_vfs import ArchiveVFS
+        vfs = ArchiveVFS(args[1])
+        modules = iter_modules_in_exe(vfs)
+    elif not os.path.isdir(PYZ_ROOT):
+        log(f"[-] PYZ_ROOT directory {PYZ_ROOT!r} not found.")
+        sys.exit(1)
+    else:
+        modules = iter_modules_on_disk()
+
+    os.makedirs(OUT_ROOT, exist_ok=True)
+
+    jsonl_out = None
+    dump = dump_code_object
+    if jsonl:
+        jsonl_out = open(JSONL_PATH, "w", encoding="utf-8", buffering=JSONL_BUFFER_SIZE)
+        dump = partial(dump_code_object_jsonl, out=jsonl_out)
+        log(f"[+] Writing {JSONL_PATH}")
+
+    seen = {"aliases": []}
+    for module_rel_path, code in modules:
+        if code is None:
+            continue
+
+        # Derive a module-ish name: "pkg/sub/file" -> "pkg.sub.file"
+        mod_name = os.path.splitext(module_rel_path)[0].replace(os.sep, ".")
+        # Top-level code object qualified name starts as module name
+        walk_code_object(code, mod_name, module_rel_path, dump, seen)
 
-            # Derive a module-ish name: "pkg/sub/file" -> "pkg.sub.file"
-            mod_name = os.path.splitext(module_rel_path)[0].replace(os.sep, ".")
-            # Top-level code object qualified name starts as module name
-            walk_code_object(code, mod_name, module_rel_path)
+    if jsonl_out is not None:
+        jsonl_out.close()
+    write_aliases(seen)
 
     log(f"[+] Done. Disassembly written under {OUT_ROOT!r}")
 
@@ -0,0 +1,114 @@
+import os
+import sys
+import gc
+import time
+import tracemalloc
+
+# The game modules live in decompiled_to_py, next to decompiled copies of
+# stdlib modules (random.py, typing.py, ...). Append rather than prepend, so
+# the real stdlib still wins.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "decompiled_to_py"))
+
+from entities import Item, Room, World
+
+# Memory per entity for worlds of N plain Items spread over rooms, measured
+# with tracemalloc (everything allocated while building the world), next to
+# the same world built from __dict__ based stand-ins as a baseline
+
+DEFAULT_SIZES = [10 ** 5, 10 ** 6]
+ITEMS_PER_ROOM = 1000
+
+
+def log(msg: str):
+    print(msg)
+
+
+class DictEntity:
+    # Stand-in for an entity with the same attributes as Entity, kept in a
+    # per-instance __dict__ instead of slots
+    def __init__(self, name: str):
+        self._name = name
+        self.world = None
+        self.parent = None
+        self.children = []
+        self.first_look = True
+        self._children_by_type = None
+        self._children_by_name = None
+        self._options = None
+
+    def add_child(self, child):
+        self.children.append(child)
+
+    def set_parent(self, parent):
+        self.parent = parent
+        parent.add_child(self)
+        self.world = parent.world
+        return self
+
+
+class DictWorld(DictEntity):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.rooms = {}
+        self.player = None
+        self.done = False
+        self.win = False
+        self.rng = None
+        self.clock = None
+        self.cypher = None
+
+    def set_world(self, world):
+        self.world = world
+
+    def add_child(self, child):
+        super().add_child(child)
+        self.rooms[child._name] = child
+
+
+def build_world(n_items: int, world_cls=World, room_cls=Room, item_cls=Item):
+    world = world_cls("Memory test")
+    world.set_world(world)
+    room = None
+    for i in range(n_items):
+        if i % ITEMS_PER_ROOM == 0:
+            room = room_cls(f"Room {i // ITEMS_PER_ROOM}")
+            room.set_parent(world)
+        item_cls(f"Item {i}").set_parent(room)
+    return world
+
+
+def measure(n_items: int, baseline: bool = False):
+    # Bytes per entity of the built world and of its lookup indexes, which
+    # are built on first use; the baseline stand-ins have no indexes
+    classes = (DictWorld, DictEntity, DictEntity) if baseline else (World, Room, Item)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    world = build_world(n_items, *classes)
+    built = tracemalloc.get_traced_memory()[0]
+    elapsed = time.perf_counter() - start
+
+    if not baseline:
+        for room in world.rooms.values():
+            room.get_child_by_name("")
+    indexed = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    n_entities = n_items + len(world.rooms) + 1
+    return built / n_entities, (indexed - built) / n_entities, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    layout = "__slots__" if not hasattr(Item("probe"), "__dict__") else "__dict__"
+    log(f"[+] Entity layout: {layout}")
+    for n_items in sizes:
+        built, indexes, elapsed = measure(n_items)
+        baseline, _, baseline_elapsed = measure(n_items, baseline=True)
+        log(f"[+] {n_items:>9} items: {built:7.1f} bytes/entity,"
+            f" {indexes:7.1f} bytes/entity for the indexes, built in {elapsed:.2f}s")
+        log(f"    {'__dict__ baseline':>17}: {baseline:7.1f} bytes/entity, built in {baseline_elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -85,12 +85,48 @@ Version 2.0 (March 26, 2020)
 
 from __future__ import print_function
 import os
+import re
+import hmac
+import json
+import mmap
+import types
 import struct
 import marshal
+import hashlib
 import zlib
 import sys
+import math
+import binascii
+from collections import Counter
 from uuid import uuid4 as uniquename
 
+try:
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = ProcessPoolExecutor = None  # Python 2 without the futures backport, work serially
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # Entropy of PYZ member prefixes is then computed in pure Python
+
+# AES-CTR for encrypted PYZ members: tinyaes (what PyInstaller itself uses)
+# or cryptography when available, else the much slower pure Python version
+try:
+    import tinyaes
+except ImportError:
+    tinyaes = None
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+MANIFEST_NAME = 'pyinstxtractor_manifest.json'
+MANIFEST_KEY_ENV = 'PYINSTXTRACTOR_MANIFEST_KEY'  # HMAC key used to sign / check the manifest
+CRYPT_BLOCK_SIZE = 16  # AES block size; also the IV length in front of every encrypted PYZ member
+CRYPTO_KEY_MODULE = 'pyimod00_crypto_key'
+
 
 class CTOCEntry:
     def __init__(self, position, cmprsdDataSize, uncmprsdDataSize, cmprsFlag, typeCmprsData, name):
@@ -106,11 +142,19 @@ class PyInstArchive:
     PYINST20_COOKIE_SIZE = 24           # For pyinstaller 2.0
     PYINST21_COOKIE_SIZE = 24 + 64      # For pyinstaller 2.1+
     MAGIC = b'MEI\014\013\012\013\016'  # Magic number which identifies pyinstaller
+    ZLIB_HEADER = re.compile(b'\x78[\x01\x5e\x9c\xda]') # zlib CMF/FLG pairs for the default 32K window
+    CLASSIFY_PREFIX_SIZE = 256          # Bytes of each PYZ member looked at before extraction
+    ENCRYPTED_ENTROPY = 0.9             # Fraction of the mean entropy of random bytes of the same length
+    MARSHAL_CODE_TYPES = (b'c', b'\xe3') # TYPE_CODE, with and without FLAG_REF
+    MAX_INFLATE_RATIO = 8               # Recovered streams may inflate to at most this times the data scanned
 
     def __init__(self, path):
         self.filePath = path
         self.pycMagic = b'\0' * 4
         self.barePycList = [] # List of pyc's whose headers have to be fixed
+        self.recover = False  # Scan for code objects when a TOC cannot be parsed
+        self.hashPool = None  # Worker threads hashing extracted files
+        self.hashJobs = {}    # Extracted path -> future of its SHA-256
 
 
     def open(self):
@@ -141,7 +185,12 @@ class PyInstArchive:
             print('[!] Error : File is too short or truncated')
             return False
 
-        while True:
+        # Fast path for PE files: the cookie sits right at the end of the overlay
+        self.cookiePos = self._findCookieFromPE()
+        if self.cookiePos != -1:
+            print('[+] Found cookie at end of PE overlay')
+
+        while self.cookiePos == -1:
             startPos = endPos - searchChunkSize if endPos >= searchChunkSize else 0
             chunkSize = endPos - startPos
 
@@ -178,6 +227,145 @@ class PyInstArchive:
         return True
 
 
+    def _findCookieFromPE(self):
+        # Walk the PE/COFF headers to find where the overlay starts and ends,
+        # then check for the cookie at the end of the overlay. Returns -1 if
+        # the file is not a PE or anything looks unusual, so the caller can
+        # fall back to scanning.
+        try:
+            self.fPtr.seek(0, os.SEEK_SET)
+            dosHeader = self.fPtr.read(64)
+            if len(dosHeader) < 64 or dosHeader[0:2] != b'MZ':
+                return -1
+            (peOffset, ) = struct.unpack('<I', dosHeader[0x3c:0x40])
+
+            self.fPtr.seek(peOffset, os.SEEK_SET)
+            (peMagic, machine, numSections, timeDateStamp, symTablePtr, numSymbols, optHeaderSize, characteristics) = \
+            struct.unpack('<4sHHIIIHH', self.fPtr.read(24))
+            if peMagic != b'PE\0\0' or numSections == 0:
+                return -1
+
+            optHeader = self.fPtr.read(optHeaderSize)
+            (optMagic, ) = struct.unpack('<H', optHeader[0:2])
+            if optMagic == 0x10b:       # PE32
+                dataDirPos = 96
+            elif optMagic == 0x20b:     # PE32+
+                dataDirPos = 112
+            else:
+                return -1
+
+            # Authenticode signatures are appended after the overlay, the
+            # security data directory (index 4) holds their file offset
+            (numDataDirs, ) = struct.unpack('<I', optHeader[dataDirPos - 4:dataDirPos])
+            certPos, certSize = 0, 0
+            if numDataDirs > 4 and len(optHeader) >= dataDirPos + 5 * 8:
+                (certPos, certSize) = struct.unpack('<II', optHeader[dataDirPos + 4 * 8:dataDirPos + 5 * 8])
+
+            overlayStart = 0
+            sectionTable = self.fPtr.read(numSections * 40)
+            for i in range(numSections):
+                (rawSize, rawPos) = struct.unpack('<II', sectionTable[i * 40 + 16:i * 40 + 24])
+                overlayStart = max(overlayStart, rawPos + rawSize)
+
+        except (struct.error, ValueError, OSError):
+            return -1
+
+        overlayEnd = certPos if certSize != 0 and overlayStart <= certPos <= self.fileSize else self.fileSize
+
+        for cookieSize in (self.PYINST21_COOKIE_SIZE, self.PYINST20_COOKIE_SIZE):
+            cookiePos = overlayEnd - cookieSize
+            if cookiePos < overlayStart:
+                continue
+
+            self.fPtr.seek(cookiePos, os.SEEK_SET)
+            cookie = self.fPtr.read(self.PYINST20_COOKIE_SIZE)
+            if cookie[0:len(self.MAGIC)] != self.MAGIC:
+                continue
+
+            # The package length must put the archive inside the overlay
+            (lengthofPackage, ) = struct.unpack('!I', cookie[8:12])
+            if overlayStart <= overlayEnd - lengthofPackage:
+                return cookiePos
+
+        return -1
+
+
+    def carveArchives(self):
+        # Scan the whole file (exe, memory dump, concatenated bundles...) for every
+        # cookie, not just the last one, and keep those with a sane CArchive header
+        print('[+] Carving {0} for embedded CArchives'.format(self.filePath))
+        self.carvedArchives = []
+
+        if self.fileSize < self.PYINST20_COOKIE_SIZE:
+            print('[!] Error : File is too short or truncated')
+            return False
+
+        mm = mmap.mmap(self.fPtr.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            offs = mm.find(self.MAGIC)
+            while offs != -1:
+                archive = self._validateCookie(mm, offs)
+                if archive is not None:
+                    self.carvedArchives.append(archive)
+                offs = mm.find(self.MAGIC, offs + 1)
+        finally:
+            mm.close()  # Not a context manager on Python 2
+
+        for archive in self.carvedArchives:
+            print('[+] CArchive at offset {0:#x} (cookie at {1:#x}): pyinstaller {2}, python {3}.{4}, {5} bytes, {6} TOC entries'.format(
+                archive['archivePos'], archive['cookiePos'],
+                '2.1+' if archive['pyinstVer'] == 21 else '2.0',
+                archive['pymaj'], archive['pymin'],
+                archive['lengthofPackage'], archive['tocEntries']))
+
+        print('[+] Found {0} embedded CArchive(s)'.format(len(self.carvedArchives)))
+        return len(self.carvedArchives) > 0
+
+
+    def _validateCookie(self, mm, cookiePos):
+        # Check that a cookie candidate describes a CArchive that fits inside the
+        # file and has a parseable TOC. Returns a description dict or None.
+        if mm[cookiePos + self.PYINST20_COOKIE_SIZE:cookiePos + self.PYINST21_COOKIE_SIZE].lower().find(b'python') != -1:
+            pyinstVer, cookieSize = 21, self.PYINST21_COOKIE_SIZE
+        else:
+            pyinstVer, cookieSize = 20, self.PYINST20_COOKIE_SIZE
+
+        if cookiePos + cookieSize > len(mm):
+            return None
+
+        (magic, lengthofPackage, toc, tocLen, pyver) = \
+        struct.unpack('!8sIIii', mm[cookiePos:cookiePos + self.PYINST20_COOKIE_SIZE])
+
+        archivePos = cookiePos + cookieSize - lengthofPackage
+        if archivePos < 0 or tocLen <= 0 or toc + tocLen > lengthofPackage - cookieSize:
+            return None
+
+        pymaj, pymin = (pyver//100, pyver%100) if pyver >= 100 else (pyver//10, pyver%10)
+        if pymaj not in (2, 3):
+            return None
+
+        # Walk the TOC entry sizes without decoding the names
+        tocPos = archivePos + toc
+        parsedLen = 0
+        tocEntries = 0
+        while parsedLen < tocLen:
+            (entrySize, ) = struct.unpack('!i', mm[tocPos + parsedLen:tocPos + parsedLen + 4])
+            if entrySize <= struct.calcsize('!iIIIBc') or parsedLen + entrySize > tocLen:
+                return None
+            parsedLen += entrySize
+            tocEntries += 1
+
+        return {
+            'cookiePos': cookiePos,
+            'archivePos': archivePos,
+            'lengthofPackage': lengthofPackage,
+            'pyinstVer': pyinstVer,
+            'pymaj': pymaj,
+            'pymin': pymin,
+            'tocEntries': tocEntries,
+        }
+
+
     def getCArchiveInfo(self):
         try:
             if self.pyinstVer == 20:
@@ -223,13 +411,17 @@ class PyInstArchive:
 
         # Parse table of contents
         while parsedLen < self.tableOfContentsSize:
-            (entrySize, ) = struct.unpack('!i', self.fPtr.read(4))
-            nameLen = struct.calcsize('!iIIIBc')
+            try:
+                (entrySize, ) = struct.unpack('!i', self.fPtr.read(4))
+                nameLen = struct.calcsize('!iIIIBc')
 
-            (entryPos, cmprsdDataSize, uncmprsdDataSize, cmprsFlag, typeCmprsData, name) = \
-            struct.unpack( \
-                '!IIIBc{0}s'.format(entrySize - nameLen), \
-                self.fPtr.read(entrySize - 4))
+                (entryPos, cmprsdDataSize, uncmprsdDataSize, cmprsFlag, typeCmprsData, name) = \
+                struct.unpack( \
+                    '!IIIBc{0}s'.format(entrySize - nameLen), \
+                    self.fPtr.read(entrySize - 4))
+            except (struct.error, ValueError):
+                print('[!] Error : The table of contents is truncated or corrupted')
+                return False
 
             try:
                 name = name.decode("utf-8").rstrip("\0")
@@ -258,6 +450,108 @@ class PyInstArchive:
 
             parsedLen += entrySize
         print('[+] Found {0} files in CArchive'.format(len(self.tocList)))
+        return True
+
+
+    def recoverFiles(self):
+        # TOC-less recovery: scan the whole package for zlib streams holding code objects
+        print('[+] Recovering code objects without a table of contents...please standby')
+        if self.pymaj != sys.version_info.major or self.pymin != sys.version_info.minor:
+            print('[!] Error: Recovery needs to unmarshal, please run this script in Python {0}.{1}'.format(self.pymaj, self.pymin))
+            return False
+
+        extractionDir = os.path.join(os.getcwd(), os.path.basename(self.filePath) + '_extracted')
+        if not os.path.exists(extractionDir):
+            os.mkdir(extractionDir)
+        os.chdir(extractionDir)
+
+        try:
+            from importlib.util import MAGIC_NUMBER
+        except ImportError:
+            from imp import get_magic
+            MAGIC_NUMBER = get_magic()
+        self.pycMagic = MAGIC_NUMBER
+
+        self.fPtr.seek(self.overlayPos, os.SEEK_SET)
+        data = self.fPtr.read(self.cookiePos - self.overlayPos)
+        self._writeRecovered('', self._recoverCodeObjects(data, self.overlayPos))
+        self._writeManifest()
+        return True
+
+
+    def _recoverCodeObjects(self, data, baseOffset):
+        # Inflate every zlib header candidate in parallel (zlib releases the GIL)
+        # and keep the streams that unmarshal to a code object.
+        # Returns a list of (file offset, name, marshalled code) sorted by offset.
+        view = memoryview(data) if sys.version_info[0] >= 3 else data  # Python 2 zlib takes no memoryview
+        candidates = [m.start() for m in self.ZLIB_HEADER.finditer(data)]
+        candidates = [offs for offs in candidates if struct.unpack('>H', data[offs:offs + 2])[0] % 31 == 0]
+
+        maxLength = self.MAX_INFLATE_RATIO * len(data)
+
+        def tryInflate(offs):
+            # Capped, so a candidate that is a decompression bomb cannot
+            # exhaust memory; one that still has input left at the cap is no
+            # code object
+            inflater = zlib.decompressobj()
+            try:
+                raw = inflater.decompress(view[offs:], maxLength)
+            except zlib.error:
+                return None
+            # (no eof on Python 2, truncated streams then fail to unmarshal)
+            if inflater.unconsumed_tail or not getattr(inflater, 'eof', True):
+                return None
+
+            code = raw[16:] if raw[2:4] == b'\r\n' else raw  # Strip pyc header (< pyinstaller 5.3)
+            try:
+                obj = marshal.loads(code)
+            except Exception:
+                return None
+            if not isinstance(obj, types.CodeType):
+                return None
+            return (offs, len(view) - offs - len(inflater.unused_data), self._nameFromCode(obj), code)
+
+        with newPool(ThreadPoolExecutor) as pool:
+            results = [r for r in pool.map(tryInflate, candidates) if r is not None]
+
+        # Drop candidates that were found inside an already recovered stream
+        recovered = []
+        streamEnd = 0
+        for (offs, length, name, code) in results:
+            if offs < streamEnd:
+                continue
+            streamEnd = offs + length
+            recovered.append((baseOffset + offs, name, code))
+
+        print('[+] Recovered {0} code objects from {1} zlib candidates'.format(len(recovered), len(candidates)))
+        return recovered
+
+
+    def _nameFromCode(self, code):
+        # co_filename holds the module relative path, e.g. 'email\\__init__.py'
+        fileName = code.co_filename.replace('\\', '/').lstrip('/')
+        fileName = os.path.splitext(fileName)[0].replace('..', '__')
+        if fileName == '' or fileName.startswith('<'):
+            fileName = 'recovered'
+        if code.co_name != '<module>':
+            fileName += '.' + code.co_name.strip('<>')
+        return fileName.replace('/', os.path.sep)
+
+
+    def _writeRecovered(self, dirName, recovered):
+        usedNames = set()
+        for (offs, name, code) in recovered:
+            if name in usedNames:
+                name = '{0}_{1:x}'.format(name, offs)
+            usedNames.add(name)
+
+            filePath = os.path.join(dirName, name + '.pyc')
+            fileDir = os.path.dirname(filePath)
+            if fileDir != '' and not os.path.exists(fileDir):
+                os.makedirs(fileDir)
+
+            print('[+] Recovered {0} at offset {1:#x}'.format(filePath, offs))
+            self._writePyc(filePath, code)
 
 
     def _writeRawData(self, filepath, data):
@@ -266,10 +560,89 @@ class PyInstArchive:
         if nmDir != '' and not os.path.exists(nmDir): # Check if path exists, create if not
             os.makedirs(nmDir)
 
+        self._hashData(nm, data)
         with open(nm, 'wb') as f:
             f.write(data)
 
 
+    def _copyRawData(self, filepath, position, size):
+        nm = filepath.replace('\\', os.path.sep).replace('/', os.path.sep).replace('..', '__')
+        nmDir = os.path.dirname(nm)
+        if nmDir != '' and not os.path.exists(nmDir): # Check if path exists, create if not
+            os.makedirs(nmDir)
+
+        with open(nm, 'wb') as f:
+            copied = self._copyFileRange(self.fPtr.fileno(), f.fileno(), position, size)
+            if copied < size:
+                # No kernel-side copy available (e.g. Windows), copy the rest in chunks
+                self.fPtr.seek(position + copied, os.SEEK_SET)
+                remaining = size - copied
+                while remaining > 0:
+                    chunk = self.fPtr.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+
+        # Nothing in memory to hash, the worker reads the file back instead
+        if self.hashPool is None:
+            self.hashPool = newPool(ThreadPoolExecutor)
+        self.hashJobs[nm] = self.hashPool.submit(hashFile, nm)
+
+
+    def _copyFileRange(self, srcFd, dstFd, position, size):
+        # Copy size bytes at position of srcFd to the current offset of dstFd
+        # using copy_file_range, or sendfile when that is not available.
+        # Returns the number of bytes copied.
+        copied = 0
+        for copyFn in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, copyFn):
+                continue
+            try:
+                while copied < size:
+                    if copyFn == 'copy_file_range':
+                        n = os.copy_file_range(srcFd, dstFd, size - copied, position + copied)
+                    else:
+                        n = os.sendfile(dstFd, srcFd, position + copied, size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+                return copied
+            except OSError:
+                # Unsupported for these files (EXDEV, ENOSYS, EINVAL...), try the next way
+                continue
+        return copied
+
+
+    def _hashData(self, filepath, *chunks):
+        # Hash on a worker thread while the main thread carries on writing
+        if self.hashPool is None:
+            self.hashPool = newPool(ThreadPoolExecutor)
+        self.hashJobs[filepath] = self.hashPool.submit(hashChunks, *chunks)
+
+
+    def _writeManifest(self):
+        if self.hashPool is None:
+            return
+
+        files = {}
+        for (filepath, job) in self.hashJobs.items():
+            files[os.path.normpath(filepath).replace(os.path.sep, '/')] = job.result()
+        self.hashPool.shutdown()
+        self.hashPool = None
+
+        manifest = {'algorithm': 'sha256', 'files': files}
+        key = os.environ.get(MANIFEST_KEY_ENV)
+        if key:
+            manifest['hmac'] = signManifest(files, key)
+        else:
+            print('[!] Warning: {0} is not set, writing an unsigned manifest'.format(MANIFEST_KEY_ENV))
+
+        with open(MANIFEST_NAME, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        print('[+] Wrote manifest of {0} files to {1}'.format(len(files), MANIFEST_NAME))
+
+
     def extractFiles(self):
         print('[+] Beginning extraction...please standby')
         extractionDir = os.path.join(os.getcwd(), os.path.basename(self.filePath) + '_extracted')
@@ -280,8 +653,19 @@ class PyInstArchive:
         os.chdir(extractionDir)
 
         for entry in self.tocList:
-            self.fPtr.seek(entry.position, os.SEEK_SET)
-            data = self.fPtr.read(entry.cmprsdDataSize)
+            if entry.typeCmprsData == b'd' or entry.typeCmprsData == b'o':
+                # d -> ARCHIVE_ITEM_DEPENDENCY
+                # o -> ARCHIVE_ITEM_RUNTIME_OPTION
+                # These are runtime options, not files
+                continue
+
+            # Stored (uncompressed) files that are written out as is never
+            # need to pass through memory, the kernel copies them directly
+            passthrough = entry.cmprsFlag == 0 and entry.typeCmprsData not in (b's', b'M', b'm')
+
+            if not passthrough:
+                self.fPtr.seek(entry.position, os.SEEK_SET)
+                data = self.fPtr.read(entry.cmprsdDataSize)
 
             if entry.cmprsFlag == 1:
                 try:
@@ -293,12 +677,6 @@ class PyInstArchive:
                 # Comment out the assertion in such a case
                 assert len(data) == entry.uncmprsdDataSize # Sanity Check
 
-            if entry.typeCmprsData == b'd' or entry.typeCmprsData == b'o':
-                # d -> ARCHIVE_ITEM_DEPENDENCY
-                # o -> ARCHIVE_ITEM_RUNTIME_OPTION
-                # These are runtime options, not files
-                continue
-
             basePath = os.path.dirname(entry.name)
             if basePath != '':
                 # Check if path exists, create if not
@@ -337,35 +715,44 @@ class PyInstArchive:
                     self._writePyc(entry.name + '.pyc', data)
 
             else:
-                self._writeRawData(entry.name, data)
+                if passthrough:
+                    self._copyRawData(entry.name, entry.position, entry.cmprsdDataSize)
+                else:
+                    self._writeRawData(entry.name, data)
 
                 if entry.typeCmprsData == b'z' or entry.typeCmprsData == b'Z':
                     self._extractPyz(entry.name)
 
         # Fix bare pyc's if any
         self._fixBarePycs()
+        self._writeManifest()
 
 
     def _fixBarePycs(self):
         for pycFile in self.barePycList:
-            with open(pycFile, 'r+b') as pycFile:
+            with open(pycFile, 'r+b') as f:
                 # Overwrite the first four bytes
-                pycFile.write(self.pycMagic)
+                f.write(self.pycMagic)
+
+            if self.hashPool is not None:
+                self.hashJobs[pycFile] = self.hashPool.submit(hashFile, pycFile)
 
 
     def _writePyc(self, filename, data):
-        with open(filename, 'wb') as pycFile:
-            pycFile.write(self.pycMagic)            # pyc magic
+        header = self.pycMagic                  # pyc magic
 
-            if self.pymaj >= 3 and self.pymin >= 7:                # PEP 552 -- Deterministic pycs
-                pycFile.write(b'\0' * 4)        # Bitfield
-                pycFile.write(b'\0' * 8)        # (Timestamp + size) || hash 
+        if self.pymaj >= 3 and self.pymin >= 7:                # PEP 552 -- Deterministic pycs
+            header += b'\0' * 4                 # Bitfield
+            header += b'\0' * 8                 # (Timestamp + size) || hash 
 
-            else:
-                pycFile.write(b'\0' * 4)      # Timestamp
-                if self.pymaj >= 3 and self.pymin >= 3:
-                    pycFile.write(b'\0' * 4)  # Size parameter added in Python 3.3
+        else:
+            header += b'\0' * 4                 # Timestamp
+            if self.pymaj >= 3 and self.pymin >= 3:
+                header += b'\0' * 4             # Size parameter added in Python 3.3
 
+        self._hashData(filename, header, data)
+        with open(filename, 'wb') as pycFile:
+            pycFile.write(header)
             pycFile.write(data)
 
 
@@ -401,7 +788,15 @@ class PyInstArchive:
             try:
                 toc = marshal.load(f)
             except:
-                print('[!] Unmarshalling FAILED. Cannot extract {0}. Extracting remaining files.'.format(name))
+                if not self.recover:
+                    print('[!] Unmarshalling FAILED. Cannot extract {0}. Extracting remaining files.'.format(name))
+                    return
+
+                print('[!] Unmarshalling FAILED. Recovering {0} without its table of contents.'.format(name))
+                f.seek(0, os.SEEK_SET)
+                data = f.read()
+                payloadEnd = tocPosition if 12 < tocPosition <= len(data) else len(data)
+                self._writeRecovered(dirName, self._recoverCodeObjects(data[12:payloadEnd], 12))
                 return
 
             print('[+] Found {0} files in PYZ archive'.format(len(toc)))
@@ -410,7 +805,37 @@ class PyInstArchive:
             if type(toc) == list:
                 toc = dict(toc)
 
+            # Look at a small prefix of every member first and decide how to
+            # handle it, rather than finding out from a failed decompression
+            prefixes = []
             for key in toc.keys():
+                (ispkg, pos, length) = toc[key]
+                f.seek(pos, os.SEEK_SET)
+                prefixes.append(f.read(min(length, self.CLASSIFY_PREFIX_SIZE)))
+            kinds = self._classifyPyzMembers(prefixes)
+
+            # A type byte is weak evidence; plain members have to unmarshal
+            for (i, key) in enumerate(toc.keys()):
+                if kinds[i] == 'plain':
+                    (ispkg, pos, length) = toc[key]
+                    f.seek(pos, os.SEEK_SET)
+                    if not self._isMarshalledCode(f.read(length)):
+                        kinds[i] = 'raw'
+            counts = Counter(kinds)
+            print('[+] PYZ members: {0} compressed, {1} encrypted, {2} plain, {3} unknown'.format(
+                counts['zlib'], counts['encrypted'], counts['plain'], counts['raw']))
+
+            cryptoKey = None
+            if counts['encrypted'] or counts['raw']:
+                cryptoKey = self._findCryptoKey(f, toc)
+                if cryptoKey is None:
+                    if counts['encrypted']:
+                        print('[!] Could not recover the key from {0}, encrypted members are extracted as is'.format(CRYPTO_KEY_MODULE))
+                else:
+                    print('[+] Found AES key: {0!r}'.format(cryptoKey))
+            encrypted = []  # (filePath, data, kind) of members to decrypt
+
+            for (key, kind) in zip(toc.keys(), kinds):
                 (ispkg, pos, length) = toc[key]
                 f.seek(pos, os.SEEK_SET)
                 fileName = key
@@ -434,29 +859,435 @@ class PyInstArchive:
                 if not os.path.exists(fileDir):
                     os.makedirs(fileDir)
 
+                data = f.read(length)
+                if kind == 'plain':
+                    self._writePyc(filePath, data)
+                    continue
+                if cryptoKey is not None and kind != 'zlib':
+                    # Not every encrypted member is recognised as such (short
+                    # ones in particular), so with a key try it on all of them
+                    encrypted.append((filePath, data, kind))
+                    continue
+                if kind == 'encrypted':
+                    print('[!] {0} is encrypted. Extracting as is.'.format(filePath))
+                    self._writeRawData(filePath + '.encrypted', data)
+                    continue
+                if kind == 'raw':
+                    print('[!] Unknown format of {0}. Extracting as is.'.format(filePath))
+                    self._writeRawData(filePath + '.raw', data)
+                    continue
+
                 try:
-                    data = f.read(length)
                     data = zlib.decompress(data)
                 except:
+                    if cryptoKey is not None:
+                        # An IV that happens to look like a zlib header
+                        encrypted.append((filePath, data, kind))
+                        continue
                     print('[!] Error: Failed to decompress {0}, probably encrypted. Extracting as is.'.format(filePath))
-                    open(filePath + '.encrypted', 'wb').write(data)
+                    self._writeRawData(filePath + '.encrypted', data)
                 else:
                     self._writePyc(filePath, data)
 
+            if encrypted:
+                self._decryptPyzMembers(cryptoKey, encrypted)
+
+
+    def _decryptPyzMembers(self, key, members):
+        # The pure Python AES holds the GIL, so it needs processes; a native
+        # one is fast enough that threads beat shipping the data around
+        print('[+] Decrypting {0} PYZ members'.format(len(members)))
+        nativeAes = tinyaes is not None or Cipher is not None
+        with newPool(ThreadPoolExecutor if nativeAes else ProcessPoolExecutor) as pool:
+            results = pool.map(decryptPyzMember, [key] * len(members), [data for (_, data, _) in members],
+                               chunksize=max(1, len(members) // (4 * cpuCount())))
+            for ((filePath, data, kind), plain) in zip(members, results):
+                if plain is not None:
+                    self._writePyc(filePath, plain)
+                elif kind == 'raw':
+                    print('[!] Unknown format of {0}. Extracting as is.'.format(filePath))
+                    self._writeRawData(filePath + '.raw', data)
+                else:
+                    print('[!] Error: Failed to decrypt {0}. Extracting as is.'.format(filePath))
+                    self._writeRawData(filePath + '.encrypted', data)
+
+
+    def _findCryptoKey(self, pyzFile, pyzToc):
+        # The key module is extracted from the CArchive next to the PYZ; older
+        # PyInstaller versions put it (unencrypted) inside the PYZ itself
+        keyPyc = CRYPTO_KEY_MODULE + '.pyc'
+        if os.path.exists(keyPyc):
+            with open(keyPyc, 'rb') as keyFile:
+                return cryptoKeyFromCode(keyFile.read())
+
+        for entry in self.tocList:
+            if entry.name == CRYPTO_KEY_MODULE:
+                self.fPtr.seek(entry.position, os.SEEK_SET)
+                data = self.fPtr.read(entry.cmprsdDataSize)
+                if entry.cmprsFlag == 1:
+                    data = zlib.decompress(data)
+                return cryptoKeyFromCode(data)
+
+        for (name, (ispkg, pos, length)) in pyzToc.items():
+            if name in (CRYPTO_KEY_MODULE, CRYPTO_KEY_MODULE.encode()):
+                pyzFile.seek(pos, os.SEEK_SET)
+                try:
+                    return cryptoKeyFromCode(zlib.decompress(pyzFile.read(length)))
+                except zlib.error:
+                    return None
+        return None
+
+
+    def _classifyPyzMembers(self, prefixes):
+        # 'zlib' (valid zlib header), 'plain' (marshal code type byte, to be
+        # confirmed by unmarshalling), 'encrypted' (AES-CTR output looks
+        # random) or 'raw'. Short samples of random bytes show far less than
+        # 8 bits per byte, so the entropy is compared with that of random
+        # bytes of the same length
+        entropies = self._prefixEntropies(prefixes)
+        kinds = []
+        for (prefix, entropy) in zip(prefixes, entropies):
+            if len(prefix) >= 2 and self.ZLIB_HEADER.match(prefix) and struct.unpack('>H', prefix[:2])[0] % 31 == 0:
+                kinds.append('zlib')
+            elif prefix and entropy >= self.ENCRYPTED_ENTROPY * randomEntropy(len(prefix)):
+                # Checked before the marshal type byte, which the random IV
+                # of an encrypted member starts with every 128th time
+                kinds.append('encrypted')
+            elif prefix[:1] in self.MARSHAL_CODE_TYPES:
+                kinds.append('plain')
+            else:
+                kinds.append('raw')
+        return kinds
+
+
+    def _isMarshalledCode(self, data):
+        try:
+            return isinstance(marshal.loads(data), types.CodeType)
+        except Exception:
+            return False
+
+
+    def _prefixEntropies(self, prefixes):
+        # Shannon entropy in bits per byte of every prefix, all at once with
+        # a single bincount when numpy is available
+        if not prefixes:
+            return []
+
+        if numpy is None:
+            entropies = []
+            for prefix in prefixes:
+                entropy = 0.0
+                for count in Counter(bytearray(prefix)).values():
+                    p = count / float(len(prefix))
+                    entropy -= p * math.log(p, 2)
+                entropies.append(entropy)
+            return entropies
+
+        lengths = numpy.array([len(prefix) for prefix in prefixes])
+        data = numpy.frombuffer(b''.join(prefixes), dtype=numpy.uint8)
+        owner = numpy.repeat(numpy.arange(len(prefixes)), lengths)
+        counts = numpy.bincount(owner * 256 + data, minlength=len(prefixes) * 256).reshape(len(prefixes), 256)
+        p = counts / numpy.maximum(lengths, 1)[:, None]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            terms = numpy.where(counts > 0, p * numpy.log2(p), 0.0)
+        return list(-terms.sum(axis=1))
+
+
+class SerialPool:
+    # Stands in for the concurrent.futures executors when they are missing
+    # (Python 2): runs every job right away on the calling thread
+    class Result:
+        def __init__(self, value):
+            self.value = value
+
+        def result(self):
+            return self.value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def map(self, fn, *iterables, **kwargs):
+        return [fn(*args) for args in zip(*iterables)]
+
+    def submit(self, fn, *args):
+        return self.Result(fn(*args))
+
+    def shutdown(self):
+        pass
+
+
+def newPool(executor):
+    return executor() if executor is not None else SerialPool()
+
+
+def cpuCount():
+    try:
+        return os.cpu_count() or 1
+    except AttributeError:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+
+
+RANDOM_ENTROPY = {} # Sample length -> randomEntropy(length)
+
+def randomEntropy(length):
+    # Mean Shannon entropy in bits per byte of length uniformly random bytes.
+    # Each byte value occurs c times with binomial probability pmf(c); 256
+    # random bytes average ~7.2 bits, 76 bytes ~6.0
+    if length not in RANDOM_ENTROPY:
+        p = 1.0 / 256
+        pmf = (1 - p) ** length
+        entropy = 0.0
+        for c in range(1, length + 1):
+            pmf *= (length - c + 1) / float(c) * p / (1 - p)
+            entropy -= 256 * pmf * (c / float(length)) * math.log(c / float(length), 2)
+        RANDOM_ENTROPY[length] = entropy
+    return RANDOM_ENTROPY[length]
+
+
+def hashChunks(*chunks):
+    h = hashlib.sha256()
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def hashFile(path):
+    # Chunked; hashlib.file_digest only exists on Python 3.11+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        chunk = f.read(1024 * 1024)
+        while chunk:
+            h.update(chunk)
+            chunk = f.read(1024 * 1024)
+    return h.hexdigest()
+
+
+def signManifest(files, key):
+    message = json.dumps(files, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hmac.new(key.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def verifyManifest(extractionDir):
+    # Re-hash an extracted tree in parallel and compare it against its manifest
+    manifestPath = os.path.join(extractionDir, MANIFEST_NAME)
+    try:
+        with open(manifestPath, 'r') as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError) as e:
+        print('[!] Error: Could not read manifest {0}: {1}'.format(manifestPath, e))
+        return False
+
+    files = manifest['files']
+    key = os.environ.get(MANIFEST_KEY_ENV)
+    if 'hmac' not in manifest:
+        print('[!] Warning: Manifest is not signed, only checking file hashes')
+    elif not key:
+        print('[!] Warning: {0} is not set, cannot check the manifest signature'.format(MANIFEST_KEY_ENV))
+    elif not hmac.compare_digest(manifest['hmac'], signManifest(files, key)):
+        print('[!] Error: Manifest signature does not match')
+        return False
+
+    onDisk = set()
+    for (dirpath, dirnames, filenames) in os.walk(extractionDir):
+        for name in filenames:
+            relPath = os.path.relpath(os.path.join(dirpath, name), extractionDir).replace(os.path.sep, '/')
+            if relPath != MANIFEST_NAME:
+                onDisk.add(relPath)
+
+    expected = sorted(path for path in files if path in onDisk)
+    with newPool(ThreadPoolExecutor) as pool:
+        digests = pool.map(hashFile, [os.path.join(extractionDir, path) for path in expected])
+        mismatched = [path for (path, digest) in zip(expected, digests) if digest != files[path]]
+
+    missing = sorted(set(files) - onDisk)
+    unexpected = sorted(onDisk - set(files))
+    for path in mismatched:
+        print('[!] Modified: {0}'.format(path))
+    for path in missing:
+        print('[!] Missing: {0}'.format(path))
+    for path in unexpected:
+        print('[!] Not in manifest: {0}'.format(path))
+
+    print('[+] Verified {0} files: {1} modified, {2} missing, {3} not in manifest'.format(
+        len(expected), len(mismatched), len(missing), len(unexpected)))
+    return not (mismatched or missing or unexpected)
+
+
+def cryptoKeyFromCode(data):
+    # The key module is just "key = '...'"; read the constant stored to 'key'
+    # instead of executing the module. data is a pyc, with or without header.
+    import dis
+    if not hasattr(dis, 'get_instructions'):
+        return None  # Python 2, PyInstaller did not encrypt the PYZ of Python 2 programs
+    if data[2:4] == b'\r\n':
+        data = data[16:]
+    try:
+        code = marshal.loads(data)
+    except Exception:
+        return None
+    if not isinstance(code, types.CodeType):
+        return None
+    previous = None
+    for instr in dis.get_instructions(code):
+        if instr.opname in ('STORE_NAME', 'STORE_GLOBAL') and instr.argval == 'key':
+            if previous is not None and previous.opname == 'LOAD_CONST' and isinstance(previous.argval, str):
+                return previous.argval
+        previous = instr
+    return None
+
+
+def _makeAesTables():
+    # S-box from the multiplicative inverse in GF(2^8), then the four
+    # combined SubBytes/ShiftRows/MixColumns tables of the encryption round
+    def rotl8(x, shift):
+        return ((x << shift) | (x >> (8 - shift))) & 0xff
+
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        p = p ^ ((p << 1) & 0xff) ^ (0x1b if p & 0x80 else 0)
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xff
+        if q & 0x80:
+            q ^= 0x09
+        sbox[p] = q ^ rotl8(q, 1) ^ rotl8(q, 2) ^ rotl8(q, 3) ^ rotl8(q, 4) ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+
+    te0 = []
+    for x in sbox:
+        x2 = ((x << 1) ^ (0x1b if x & 0x80 else 0)) & 0xff
+        te0.append((x2 << 24) | (x << 16) | (x << 8) | (x2 ^ x))
+    te1 = [((t >> 8) | (t << 24)) & 0xffffffff for t in te0]
+    te2 = [((t >> 16) | (t << 16)) & 0xffffffff for t in te0]
+    te3 = [((t >> 24) | (t << 8)) & 0xffffffff for t in te0]
+    return sbox, te0, te1, te2, te3
+
+AES_SBOX, AES_TE0, AES_TE1, AES_TE2, AES_TE3 = _makeAesTables()
+
+
+def aesExpandKey(key):
+    # Round keys as 32-bit words, for 16, 24 or 32 byte keys
+    nk = len(key) // 4
+    if len(key) not in (16, 24, 32):
+        raise ValueError('AES key must be 16, 24 or 32 bytes long')
+    rounds = nk + 6
+    words = list(struct.unpack('>{0}I'.format(nk), key))
+    rcon = 1
+    for i in range(nk, 4 * (rounds + 1)):
+        t = words[i - 1]
+        if i % nk == 0:
+            t = ((t << 8) | (t >> 24)) & 0xffffffff
+            t = (AES_SBOX[t >> 24] << 24) | (AES_SBOX[(t >> 16) & 0xff] << 16) | (AES_SBOX[(t >> 8) & 0xff] << 8) | AES_SBOX[t & 0xff]
+            t ^= rcon << 24
+            rcon = ((rcon << 1) ^ (0x1b if rcon & 0x80 else 0)) & 0xff
+        elif nk > 6 and i % nk == 4:
+            t = (AES_SBOX[t >> 24] << 24) | (AES_SBOX[(t >> 16) & 0xff] << 16) | (AES_SBOX[(t >> 8) & 0xff] << 8) | AES_SBOX[t & 0xff]
+        words.append(words[i - nk] ^ t)
+    return words, rounds
+
+
+def aesEncryptBlock(roundKeys, rounds, block):
+    # Encrypt one block given as a 128-bit integer, returns a 128-bit integer
+    te0, te1, te2, te3, sbox, rk = AES_TE0, AES_TE1, AES_TE2, AES_TE3, AES_SBOX, roundKeys
+    s0 = ((block >> 96) & 0xffffffff) ^ rk[0]
+    s1 = ((block >> 64) & 0xffffffff) ^ rk[1]
+    s2 = ((block >> 32) & 0xffffffff) ^ rk[2]
+    s3 = (block & 0xffffffff) ^ rk[3]
+    for r in range(4, 4 * rounds, 4):
+        t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xff] ^ te2[(s2 >> 8) & 0xff] ^ te3[s3 & 0xff] ^ rk[r]
+        t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xff] ^ te2[(s3 >> 8) & 0xff] ^ te3[s0 & 0xff] ^ rk[r + 1]
+        t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xff] ^ te2[(s0 >> 8) & 0xff] ^ te3[s1 & 0xff] ^ rk[r + 2]
+        t3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xff] ^ te2[(s1 >> 8) & 0xff] ^ te3[s2 & 0xff] ^ rk[r + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+    r = 4 * rounds
+    o0 = ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 0xff] << 16) | (sbox[(s2 >> 8) & 0xff] << 8) | sbox[s3 & 0xff]) ^ rk[r]
+    o1 = ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 0xff] << 16) | (sbox[(s3 >> 8) & 0xff] << 8) | sbox[s0 & 0xff]) ^ rk[r + 1]
+    o2 = ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 0xff] << 16) | (sbox[(s0 >> 8) & 0xff] << 8) | sbox[s1 & 0xff]) ^ rk[r + 2]
+    o3 = ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 0xff] << 16) | (sbox[(s1 >> 8) & 0xff] << 8) | sbox[s2 & 0xff]) ^ rk[r + 3]
+    return (o0 << 96) | (o1 << 64) | (o2 << 32) | o3
+
+
+def aesCtrXcrypt(key, iv, data):
+    # AES-CTR as tinyaes does it: the IV is the initial counter block,
+    # incremented as a big endian 128-bit number
+    if tinyaes is not None:
+        return tinyaes.AES(key, iv).CTR_xcrypt_buffer(data)
+    if Cipher is not None:
+        cipher = Cipher(algorithms.AES(key), modes.CTR(iv)).decryptor()
+        return cipher.update(data) + cipher.finalize()
+    return pyAesCtrXcrypt(key, iv, data)
+
+
+def pyAesCtrXcrypt(key, iv, data):
+    # (int.from_bytes / to_bytes are Python 3 only, so go through hex)
+    roundKeys, rounds = aesExpandKey(key)
+    if not data:
+        return b''
+    counter = int(binascii.hexlify(iv), 16)
+    blocks = []
+    for _ in range((len(data) + CRYPT_BLOCK_SIZE - 1) // CRYPT_BLOCK_SIZE):
+        block = aesEncryptBlock(roundKeys, rounds, counter)
+        blocks.append(struct.pack('>QQ', block >> 64, block & 0xffffffffffffffff))
+        counter = (counter + 1) & ((1 << 128) - 1)
+    keystream = b''.join(blocks)[:len(data)]
+    plain = int(binascii.hexlify(data), 16) ^ int(binascii.hexlify(keystream), 16)
+    return binascii.unhexlify('{0:0{1}x}'.format(plain, 2 * len(data)))
+
+
+def decryptPyzMember(key, data):
+    # Worker for the decryption pool: same key handling as
+    # pyimod01_archive.Cipher, then decompress. None if it does not inflate.
+    key = key[0:CRYPT_BLOCK_SIZE] if len(key) > CRYPT_BLOCK_SIZE else key.zfill(CRYPT_BLOCK_SIZE)
+    try:
+        return zlib.decompress(aesCtrXcrypt(key.encode(), data[:CRYPT_BLOCK_SIZE], data[CRYPT_BLOCK_SIZE:]))
+    except zlib.error:
+        return None
+
 
 def main():
-    if len(sys.argv) < 2:
-        print('[+] Usage: pyinstxtractor.py <filename>')
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    opts = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+
+    if len(args) < 1:
+        print('[+] Usage: pyinstxtractor.py [--carve] [--recover] <filename>')
+        print('[+]        pyinstxtractor.py --verify <extracted directory>')
+
+    elif '--verify' in opts:
+        if not verifyManifest(args[0]):
+            sys.exit(1)
+
+    elif '--carve' in opts:
+        arch = PyInstArchive(args[0])
+        if arch.open():
+            arch.carveArchives()
+            arch.close()
 
     else:
-        arch = PyInstArchive(sys.argv[1])
+        arch = PyInstArchive(args[0])
+        arch.recover = '--recover' in opts
         if arch.open():
             if arch.checkFile():
                 if arch.getCArchiveInfo():
-                    arch.parseTOC()
-                    arch.extractFiles()
+                    if arch.parseTOC():
+                        arch.extractFiles()
+                    elif arch.recover:
+                        if not arch.recoverFiles():
+                            arch.close()
+                            return
+                    else:
+                        print('[!] Re-run with --recover to scan for code objects without the table of contents')
+                        arch.close()
+                        return
                     arch.close()
-                    print('[+] Successfully extracted pyinstaller archive: {0}'.format(sys.argv[1]))
+                    print('[+] Successfully extracted pyinstaller archive: {0}'.format(args[0]))
                     print('')
                     print('You can now use a python decompiler on the pyc files within the extracted directory')
                     return
@@ -1,4 +1,8 @@
 import os, sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PyInstaller.archive.readers import CArchiveReader, ZlibArchiveReader
 
 EXE = "TheFactory.exe"
@@ -8,60 +12,125 @@ def ensure_dir(path: str):
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
 
-def extract_archive(archive_name: str, archive, base_out: str):
-    # Recursively extract contents of PyInstaller archive
-    print(f"[+] Processing archive {archive_name!r} ({type(archive).__name__})")
+class ExtractionReport:
+    # Shared progress / error counters for all extraction tasks
+    PROGRESS_INTERVAL = 0.5  # seconds between progress lines
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.archives = []
+        self.written = 0
+        self.errors = []
+        self.last_progress = 0.0
+
+    def archive(self, archive_name: str, archive):
+        with self.lock:
+            self.archives.append((archive_name, type(archive).__name__))
+
+    def wrote(self, out_path: str):
+        with self.lock:
+            self.written += 1
+            now = time.monotonic()
+            if now - self.last_progress < self.PROGRESS_INTERVAL:
+                return
+            self.last_progress = now
+            written, errors = self.written, len(self.errors)
+        print(f"\r    [*] {written} members written, {errors} errors", end="", flush=True)
+
+    def error(self, message: str):
+        with self.lock:
+            self.errors.append(message)
+
+    def summary(self):
+        print()
+        for archive_name, archive_type in self.archives:
+            print(f"[+] Processed archive {archive_name!r} ({archive_type})")
+        for message in self.errors:
+            print(f"    [!] {message}")
+        print(f"[+] {self.written} members written, {len(self.errors)} errors")
+
+
+class ExtractionQueue:
+    # Work queue on top of a shared thread pool. Tasks may submit more tasks
+    # (embedded archives do), so wait() keeps draining until nothing is left.
+    def __init__(self, report: ExtractionReport, max_workers=None):
+        self.report = report
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.pending = deque()
+
+    def submit(self, fn, *args):
+        future = self.pool.submit(fn, self, *args)
+        with self.lock:
+            self.pending.append(future)
+
+    def wait(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    break
+                future = self.pending.popleft()
+            try:
+                future.result()
+            except Exception as e:
+                self.report.error(f"Unexpected error: {e}")
+        self.pool.shutdown()
+
+
+def write_member(queue: ExtractionQueue, archive_name: str, archive, name: str, base_out: str, raw: bool):
+    # Extract a single member and write it under base_out
+    try:
+        if raw:
+            # raw=True => get compressed member’s actual bytes
+            data = archive.extract(name, raw=True)
+        else:
+            data = archive.extract(name)
+    except Exception as e:
+        queue.report.error(f"Failed to extract {name!r} from {archive_name!r}: {e}")
+        return
+
+    if data is None:
+        return
+
+    out_path = os.path.join(base_out, name)
+    ensure_dir(out_path)
+    with open(out_path, "wb") as f:
+        f.write(data)
+    queue.report.wrote(out_path)
+
+
+def open_embedded(queue: ExtractionQueue, archive, name: str, base_out: str):
+    # typecode 'z' = embedded PYZ/PKG, opened as its own task
+    try:
+        embedded = archive.open_embedded_archive(name)
+    except Exception as e:
+        queue.report.error(f"Could not open embedded archive {name!r}: {e}")
+        return
+    subdir = os.path.join(base_out, name.replace(os.sep, "_"))
+    os.makedirs(subdir, exist_ok=True)
+    extract_archive(name, embedded, subdir, queue)
+
+
+def extract_archive(archive_name: str, archive, base_out: str, queue: ExtractionQueue):
+    # Queue the contents of PyInstaller archive; embedded archives and plain
+    # members all become tasks on the shared pool
+    queue.report.archive(archive_name, archive)
 
     # CArchiveReader: EXE / PKG container
     if isinstance(archive, CArchiveReader):
         for name, (pos, length, ulen, is_compressed, typecode) in archive.toc.items():
-            # typecode 'z' = embedded PYZ/PKG
             if typecode == "z":
-                try:
-                    embedded = archive.open_embedded_archive(name)
-                except Exception as e:
-                    print(f"    [!] Could not open embedded archive {name!r}: {e}")
-                    continue
-                subdir = os.path.join(base_out, name.replace(os.sep, "_"))
-                os.makedirs(subdir, exist_ok=True)
-                extract_archive(name, embedded, subdir)
+                queue.submit(open_embedded, archive, name, base_out)
             else:
                 # Normal member: extract raw bytes if possible
-                try:
-                    data = archive.extract(name)
-                except Exception as e:
-                    print(f"    [!] Failed to extract {name!r} from {archive_name!r}: {e}")
-                    continue
-
-                if data is None:
-                    continue
-
-                out_path = os.path.join(base_out, name)
-                ensure_dir(out_path)
-                with open(out_path, "wb") as f:
-                    f.write(data)
-                print(f"    [*] Wrote {out_path}")
+                queue.submit(write_member, archive_name, archive, name, base_out, False)
 
     # ZlibArchiveReader: PYZ archive (pure Python bytecode / data)
     elif isinstance(archive, ZlibArchiveReader):
         for name, (typecode, pos, length) in archive.toc.items():
-            try:
-                # raw=True => get compressed member’s actual bytes
-                data = archive.extract(name, raw=True)
-            except Exception as e:
-                print(f"    [!] Failed to extract {name!r} from {archive_name!r}: {e}")
-                continue
-
-            if data is None:
-                continue
-
-            out_path = os.path.join(base_out, name)
-            ensure_dir(out_path)
-            with open(out_path, "wb") as f:
-                f.write(data)
-            print(f"    [*] Wrote {out_path}")
+            queue.submit(write_member, archive_name, archive, name, base_out, True)
     else:
-        print(f"[!] Unknown archive type: {type(archive)}")
+        queue.report.error(f"Unknown archive type: {type(archive)}")
 
 
 def main():
@@ -71,11 +140,16 @@ def main():
 
     os.makedirs(OUT_DIR, exist_ok=True)
 
+    report = ExtractionReport()
+    queue = ExtractionQueue(report)
+
     # Top-level EXE is a CArchiveReader
     top = CArchiveReader(EXE)
-    extract_archive(EXE, top, OUT_DIR)
+    extract_archive(EXE, top, OUT_DIR, queue)
+    queue.wait()
+    report.summary()
     print(f"[+] Done. All extracted to: {OUT_DIR!r}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
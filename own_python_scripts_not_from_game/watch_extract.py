@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+
+from archive_vfs import ArchiveVFS
+import deassemble_pyz_content as dis_dump
+
+EXE = "TheFactory.exe"
+# Same layout as unpack_pyz.py, which is what deassemble_pyz_content.py reads
+OUT_DIR = os.path.join("TheFactory.exe_extracted", "PYZ-00.pyz_extracted")
+# Compressed hash of every member from the last run
+STATE_FILE = os.path.join(OUT_DIR, "watch_state.json")
+
+POLL_INTERVAL = 1.0  # seconds
+
+
+def log(msg: str):
+    print(msg)
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: dict):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def load_aliases() -> list:
+    # Duplicate code objects listed by the last run (see dis_dump.write_aliases)
+    try:
+        with open(dis_dump.ALIAS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def member_hashes(vfs: ArchiveVFS) -> dict:
+    # VFS path -> sha256 of the member's stored (compressed) bytes, for every
+    # CArchive member and PYZ module
+    hashes = {}
+    for dirpath, dirnames, filenames in vfs.walk("/"):
+        for name in filenames:
+            path = dirpath.rstrip("/") + "/" + name
+            if vfs.kind(path) in ("carchive", "pyz"):
+                hashes[path] = hashlib.sha256(vfs.read_compressed(path)).hexdigest()
+    return hashes
+
+
+def dump_dir(module_rel_path: str) -> str:
+    # Directory deassemble_pyz_content.dump_code_object writes a module to
+    return os.path.join(dis_dump.OUT_ROOT, os.path.splitext(module_rel_path)[0])
+
+
+def out_path(path: str) -> str:
+    return os.path.join(OUT_DIR, *path.strip("/").split("/"))
+
+
+def pyz_module_rel_path(vfs: ArchiveVFS, path: str):
+    # Module path relative to its PYZ (as deassemble_pyz_content names it),
+    # or None for CArchive members
+    if vfs.kind(path) != "pyz":
+        return None
+    return path.strip("/").split("/", 1)[1]
+
+
+def apply_changes(vfs: ArchiveVFS, old: dict, new: dict):
+    changed = sorted(path for path in new if old.get(path) != new[path])
+    removed = sorted(path for path in old if path not in new)
+    if not changed and not removed:
+        log("[*] No member changed")
+        return
+
+    log(f"[+] {len(changed)} changed, {len(removed)} removed, {len(new) - len(changed)} unchanged")
+
+    for path in removed:
+        target = out_path(path)
+        if os.path.isfile(target):
+            os.remove(target)
+        log(f"    [-] Removed {target}")
+
+    for path in changed:
+        target = out_path(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with vfs.open(path) as src, open(target, "wb") as dst:
+            dst.write(src.read())
+        log(f"    [*] Wrote {target}")
+
+    # Several modules can share a disassembly directory ("email" and
+    # "email._encoded_words" both go to "email"), so redo every module of a
+    # directory that has a changed or removed module in it
+    modules_by_dir = {}
+    for path in new:
+        module_rel_path = pyz_module_rel_path(vfs, path)
+        if module_rel_path is not None:
+            modules_by_dir.setdefault(dump_dir(module_rel_path), []).append((path, module_rel_path))
+
+    stale_dirs = set()
+    for path in changed:
+        module_rel_path = pyz_module_rel_path(vfs, path)
+        if module_rel_path is not None:
+            stale_dirs.add(dump_dir(module_rel_path))
+    for path in removed:
+        if path.count("/") > 1:
+            stale_dirs.add(dump_dir(path.strip("/").split("/", 1)[1]))
+
+    # A module whose code objects were skipped as aliases of code in a stale
+    # directory has to be redone as well, the bodies it points to may be gone
+    aliases = load_aliases()
+    while True:
+        dependents = {
+            dump_dir(alias["module"]) for alias in aliases if dump_dir(alias["same_as_module"]) in stale_dirs
+        } - stale_dirs
+        if not dependents:
+            break
+        stale_dirs |= dependents
+
+    # Keep the aliases of the modules left alone, the redone ones add theirs
+    seen = {"aliases": [
+        (alias["qualname"], alias["module"], alias["same_as"], alias["same_as_module"])
+        for alias in aliases if dump_dir(alias["module"]) not in stale_dirs
+    ]}
+
+    for directory in sorted(stale_dirs):
+        shutil.rmtree(directory, ignore_errors=True)
+        for path, module_rel_path in sorted(modules_by_dir.get(directory, [])):
+            with vfs.open(path) as f:
+                code = dis_dump.load_code_object(f.read(), path)
+            if code is None:
+                continue
+            mod_name = os.path.splitext(module_rel_path)[0].replace(os.sep, ".")
+            dis_dump.walk_code_object(code, mod_name, module_rel_path, seen=seen)
+
+    dis_dump.write_aliases(seen)
+
+
+def rebuild(exe: str):
+    try:
+        vfs = ArchiveVFS(exe)
+    except OSError as e:
+        log(f"[!] {e}")
+        return
+
+    with vfs:
+        old = load_state()
+        new = member_hashes(vfs)
+        apply_changes(vfs, old, new)
+        save_state(new)
+
+
+def file_signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def watch(exe: str, interval: float = POLL_INTERVAL):
+    # Poll the executable; only rebuild once it has stopped changing, so a
+    # half-written file is never parsed
+    log(f"[+] Watching {exe!r} (every {interval}s, Ctrl+C to stop)")
+    rebuild(exe)
+    built = file_signature(exe)
+    last = built
+    while True:
+        time.sleep(interval)
+        current = file_signature(exe)
+        if current is not None and current == last and current != built:
+            log(f"[+] {exe!r} changed, updating")
+            rebuild(exe)
+            built = current
+        last = current
+
+
+def main():
+    exe = EXE
+    once = False
+    for arg in sys.argv[1:]:
+        if arg == "--once":
+            once = True
+        else:
+            exe = arg
+
+    if not os.path.isfile(exe):
+        log(f"[-] EXE {exe!r} not found.")
+        sys.exit(1)
+
+    if once:
+        rebuild(exe)
+        return
+
+    try:
+        watch(exe)
+    except KeyboardInterrupt:
+        log("[+] Stopped watching")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import os
+import sys
+import random
+
+# See entity_memory.py: append, so decompiled stdlib copies don't shadow the
+# real ones
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "decompiled_to_py"))
+
+from entities import Item, Room, World
+from player import Player
+
+# Procedural worlds for exercising the entity engine at scale. Rooms and
+# items behave like the hand written ones in the game (descriptions built
+# from the visible children, options as lambdas, take/drop, doors between
+# rooms), but are generated from a few parameters.
+
+ADJECTIVES = ["dusty", "broken", "shiny", "small", "heavy", "red", "old", "strange", "plastic", "wooden"]
+NOUNS = ["box", "lever", "cog", "ticket", "lamp", "crate", "wrench", "card", "jar", "gear"]
+
+
+class GeneratedItem(Item):
+    __slots__ = ("takeable", "checked")
+
+    def __init__(self, name: str, takeable: bool = True):
+        super().__init__(name)
+        self.takeable = takeable
+        self.checked = False
+
+    def get_description(self) -> str:
+        if self.parent == self.world.player:
+            desc = f"You have a {self.name}."
+        else:
+            desc = f"There is a {self.name} here."
+        for child in self.children:
+            if child.get_visible():
+                child_desc = child.get_description()
+                if len(child_desc) > 0:
+                    desc += "\n  " + child_desc
+        return desc
+
+    def get_options(self):
+        options = super().get_options()
+        if self.parent == self.world.player:
+            options.append((lambda: self.drop(), f"Drop the {self.name}."))
+        elif self.takeable:
+            options.append((lambda: self.take(), f"Take the {self.name}."))
+        if not self.checked:
+            options.append((lambda: self.check(), f"Check the {self.name}."))
+        return options
+
+    def take(self):
+        self.set_parent(self.world.player)
+        self.send_message(f"You take the {self.name}.")
+
+    def drop(self):
+        self.set_parent(self.world.player.parent)
+        self.send_message(f"You drop the {self.name}.")
+
+    def check(self):
+        self.checked = True
+        self.send_message(f"It is just a {self.name}.")
+
+
+class GeneratedRoom(Room):
+    __slots__ = ("exits",)
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.exits = []  # Names of the rooms reachable from here
+
+    def get_description(self) -> str:
+        desc = "$div"
+        desc += "You are in the $room."
+        for child in self.children:
+            if child.get_visible() and not child.is_a("Player"):
+                child_desc = child.get_description()
+                if len(child_desc) > 0:
+                    desc += "\n" + child_desc
+        if self.exits:
+            desc += "\nThere are doors to " + ", ".join(self.exits) + "."
+        return desc
+
+    def get_options(self):
+        options = super().get_options()
+        for exit_num, room_name in enumerate(self.exits):
+            options.append((f"exit {exit_num}", f"Go to {room_name}."))
+        return options
+
+    def handle_option_answer(self, value: str):
+        if value.startswith("exit "):
+            self.world.player.set_parent(self.world.rooms[self.exits[int(value[5:])]])
+
+
+class GeneratedWorld(World):
+    __slots__ = ()
+
+    def __init__(self, name: str = "Generated", seed=None, clock=None):
+        super().__init__(name, seed, clock)
+        self.set_world(self)
+
+
+def item_name(rng: random.Random, serial: int) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {serial}"
+
+
+def add_items(parent, rng: random.Random, count: int, depth: int, serial: list):
+    # count items under parent; every item gets count children of its own
+    # until depth runs out, so the total is count + count^2 + ... + count^depth
+    for _ in range(count):
+        serial[0] += 1
+        item = GeneratedItem(item_name(rng, serial[0]), takeable=rng.random() < 0.8)
+        item.set_parent(parent)
+        if depth > 1:
+            add_items(item, rng, count, depth - 1, serial)
+
+
+def generate_world(rooms: int = 7, items_per_room: int = 4, inventory: int = 0, depth: int = 1,
+                   exits_per_room: int = 2, seed: int = 0) -> GeneratedWorld:
+    # depth is the nesting of items in items: 1 means items directly in the
+    # rooms, 2 adds items_per_room items inside each of those, and so on
+    # Generated from the world's own RNG, which the world keeps using after
+    world = GeneratedWorld(seed=seed)
+    rng = world.rng
+    serial = [0]
+
+    room_names = [f"Room {i}" for i in range(rooms)]
+    for room_name in room_names:
+        room = GeneratedRoom(room_name)
+        room.set_parent(world)
+        add_items(room, rng, items_per_room, depth, serial)
+
+    # A ring so every room is reachable, plus random shortcuts
+    for i, room_name in enumerate(room_names):
+        room = world.rooms[room_name]
+        if rooms > 1:
+            room.exits.append(room_names[(i + 1) % rooms])
+        while len(room.exits) < min(exits_per_room, rooms - 1):
+            other = rng.choice(room_names)
+            if other != room_name and other not in room.exits:
+                room.exits.append(other)
+
+    world.player = Player("Tester")
+    world.player.set_parent(world.rooms[room_names[0]])
+    add_items(world.player, rng, inventory, 1, serial)
+    return world
+
+
+def count_entities(entity) -> int:
+    return 1 + sum(count_entities(child) for child in entity.children)